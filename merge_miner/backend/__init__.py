@@ -4,16 +4,26 @@ from .conformance import get_conformance_stats, transform_dfg_to_pn
 from .constants import *
 from .eventlog import format_df_to_eventlog
 from .discover.dfg_discovery import frequency_dfg
+from .discover.dfg_algorithms import employees_dfg_tables, get_group_dfgs
 from .heuristics import partition_dataframe_into_dfgs
 from .comparison import (get_splitted_comparison_dfgs, aggregate_by_threshold,
                          get_comparison_start_end_acts, get_comparison_dfg,
                          get_filtered_edges, join_filtered_edges,
-                         add_edge_to_islands,get_edges_to_merge_islands,
-                         partition_df_into_cases_dfgs)
+                         partition_df_into_cases_dfgs, load_unit_source,
+                         get_comparison_dfg_and_start_end_acts,
+                         get_comparison_data)
+from .sparse_dfg import SparseDFG
+from .similarity import (build_units_edge_matrix, get_units_similarity,
+                         rank_similar_units, cluster_units)
 from .discover import ProcessDiscovery
 from .discover.discover_graphviz import *
 from .types import dfg_type
 from .polars import apply_dfg_performance, PerformanceParams, get_attribute_values
+from .polars import get_dfg_performance_table, performance_table_to_dfg
+from .polars import get_dfg_duration_sketches, TDigest
+from .polars import get_dfg_frequency_and_performance, get_windowed_dfg_performance
+from .polars import get_activity_times_table, get_activities_soj_time
+from .polars import get_dfg_duration_histograms, get_wip_curve
 from .utils import get_start_end_activities, get_start_end_activities_count
 from .eventlog import get_dataframe
 from .research_essentials import *
@@ -1,17 +1,49 @@
-from .constants import CASE_CONCEPT_NAME, TIMESTAMP_NAME
-from .research_essentials import (get_edges_to_merge_islands,
-                                  add_edge_to_islands)
+from .constants import CASE_CONCEPT_NAME, TIMESTAMP_NAME, ACTIVITY_NAME
+from .research_essentials import get_edges_to_merge_dfg_islands
 from .utils import get_start_end_activities_count
-from .heuristics import partition_case_dfgs
+from .heuristics import partition_trace
+from .types import dfg_type, unit_source_type
+from typing import Iterable, Iterator
+from .eventlog import get_dataframe
 from collections import Counter
-from .types import dfg_type
 import polars as pl
 
-def partition_df_into_cases_dfgs(event_log: pl.DataFrame, percentage: float
-                                 ) -> tuple[dfg_type, dfg_type, dfg_type]:
+COMPARISON_PARTS = ("start", "middle", "end")
+
+def load_unit_source(source: unit_source_type) -> pl.DataFrame:
+    """
+    Materialize the eventlog of a single unit from its source, so the
+    comparison functions can receive the units lazily and keep only one
+    of them in memory at a time.
+
+    Parameters
+    ------------
+    source
+        A formatted eventlog dataframe, a lazy frame of it, the path of
+        a CSV file to be read by get_dataframe or a callable that returns
+        the eventlog dataframe
+
+    Returns
+    ------------
+    pl.DataFrame: The eventlog of the unit
+    """
+    if isinstance(source, pl.DataFrame):
+        return source
+    if isinstance(source, pl.LazyFrame):
+        return source.collect()
+    if isinstance(source, str):
+        return get_dataframe(source)
+    if callable(source):
+        return source()
+    raise TypeError(f"{type(source).__name__} is not a valid unit source!")
+
+def partition_df_into_cases_dfgs_and_acts(
+    event_log: pl.DataFrame, percentage: float
+) -> tuple[Counter, Counter, Counter, Counter, Counter]:
     """
     Partition the EventLog into three parts and return the Directly-Follows
-    where the values are the number of the cases with the edges.
+    where the values are the number of the cases with the edges. The start
+    and end activities are counted in the same scan over the cases.
 
     Parameters
     ------------
@@ -23,20 +55,86 @@ def partition_df_into_cases_dfgs(event_log: pl.DataFrame, percentage: float
     
     Returns
     ------------
-    tuple[Counter, Counter, Counter]: The partitioned dfgs
+    tuple[Counter, Counter, Counter, Counter, Counter]: The partitioned dfgs
+    and the count of the start and end activities
     """
     ordered_eventlog = event_log.sort([CASE_CONCEPT_NAME, TIMESTAMP_NAME])
     start_dfgs, middle_dfgs, end_dfgs = list(), list(), list()
-    for start_dfg, middle_dfg, end_dfg in partition_case_dfgs(
-        ordered_eventlog, percentage):
-
+    start_acts, end_acts = Counter(), Counter()
+    for case in ordered_eventlog.partition_by(CASE_CONCEPT_NAME):
+        event_list = case.get_column(ACTIVITY_NAME).to_list()
+        start_dfg, middle_dfg, end_dfg = partition_trace(event_list,
+                                                         percentage)
         middle_dfgs.extend(set(middle_dfg))
         start_dfgs.extend(set(start_dfg))
         end_dfgs.extend(set(end_dfg))
+        start_acts[event_list[0]] += 1
+        end_acts[event_list[-1]] += 1
+
+    return (Counter(start_dfgs), Counter(middle_dfgs), Counter(end_dfgs),
+            start_acts, end_acts)
+
+def partition_df_into_cases_dfgs(event_log: pl.DataFrame, percentage: float
+                                 ) -> tuple[dfg_type, dfg_type, dfg_type]:
+    """
+    Partition the EventLog into three parts and return the Directly-Follows
+    where the values are the number of the cases with the edges.
+
+    Parameters
+    ------------
+    event_log
+        EventLog dataframe
+    percentage
+        Percentage of the traces to be considered as start and end dfgs.
+        Defaults to 0.1 (10%)
     
-    return Counter(start_dfgs), Counter(middle_dfgs), Counter(end_dfgs)
+    Returns
+    ------------
+    tuple[Counter, Counter, Counter]: The partitioned dfgs
+    """
+    return partition_df_into_cases_dfgs_and_acts(event_log, percentage)[:3]
+
+def iter_units_comparison_data(dataframes: Iterable[unit_source_type],
+                               percentage: float=0.25
+                               ) -> Iterator[tuple[dfg_type, dfg_type,
+                                                   dfg_type, Counter,
+                                                   Counter]]:
+    """
+    Stream the units, yielding the Directly-Follows Graphs of each one
+    splitted into three parts, along with its start and end activities
+    count. The dfg values are the number of the cases with the edges
+    normalized by the number of cases. Each unit is scanned only once and
+    its events are released before the data is yielded.
+
+    Parameters
+    ------------
+    dataframes
+        Iterable of unit sources (see load_unit_source)
+    percentage
+        Percentage of the traces to be considered as start and end dfgs.
+        Defaults to 0.25 (to split into 3 parts because ceil function)
 
-def get_splitted_comparison_dfgs(dataframes: list[pl.DataFrame],
+    Yields
+    ------------
+    tuple[dfg_type, dfg_type, dfg_type, Counter, Counter]: The normalized
+    dfgs and the start and end activities count of a unit
+    """
+    for source in dataframes:
+        dataframe = load_unit_source(source)
+        start_dfg, middle_dfg, end_dfg, start_acts, end_acts = \
+            partition_df_into_cases_dfgs_and_acts(dataframe, percentage)
+        del dataframe
+
+        case_amount = start_acts.total()
+        yield ({key: value / case_amount * 100
+                for key, value in start_dfg.items()},
+               {key: value / case_amount * 100
+                for key, value in middle_dfg.items()},
+               {key: value / case_amount * 100
+                for key, value in end_dfg.items()},
+               start_acts, end_acts)
+
+def get_splitted_comparison_dfgs(dataframes: Iterable[unit_source_type],
                                  percentage: float=0.25
                                  ) -> tuple[Counter, Counter, Counter]:
     """
@@ -47,7 +145,7 @@ def get_splitted_comparison_dfgs(dataframes: list[pl.DataFrame],
     Parameters
     ------------
     dataframes
-        List of dataframes
+        Iterable of unit sources (see load_unit_source)
     percentage
         Percentage of the traces to be considered as start and end dfgs.
         Defaults to 0.25 (to split into 3 parts because ceil function)
@@ -57,17 +155,8 @@ def get_splitted_comparison_dfgs(dataframes: list[pl.DataFrame],
     tuple[Counter, Counter, Counter]: The comparison of the dfgs
     """
     start_dfgs, middle_dfgs, end_dfgs = list(), list(), list()
-    for dataframe in dataframes:
-        case_amount = len(dataframe[CASE_CONCEPT_NAME].unique())
-        start_dfg, middle_dfg, end_dfg = partition_df_into_cases_dfgs(
-            dataframe, percentage)
-
-        start_dfg = {key: value / case_amount * 100
-                for key, value in start_dfg.items()}
-        middle_dfg = {key: value / case_amount * 100
-                for key, value in middle_dfg.items()}
-        end_dfg = {key: value / case_amount * 100
-                for key, value in end_dfg.items()}
+    for start_dfg, middle_dfg, end_dfg, _, _ in iter_units_comparison_data(
+        dataframes, percentage):
 
         start_dfgs.append(start_dfg)
         middle_dfgs.append(middle_dfg)
@@ -75,7 +164,56 @@ def get_splitted_comparison_dfgs(dataframes: list[pl.DataFrame],
     
     return start_dfgs, middle_dfgs, end_dfgs
 
-def aggregate_by_threshold(frequency_list: list[dfg_type],
+def update_frequencies(frequencies: dict[tuple[str, str], list[float]],
+                       dfg: dfg_type) -> dict[tuple[str, str], list[float]]:
+    '''
+    Append the values of a unit dfg to the per-edge list of frequencies,
+    which is the only state kept between the units while streaming them.
+
+    Parameters
+    ------------
+    frequencies
+        The frequencies of each edge on the units already seen
+    dfg
+        The normalized dfg of the current unit
+
+    Returns
+    ------------
+    dict[tuple[str, str], list[float]]: The updated frequencies
+    '''
+    for acts, freq in dfg.items():
+        if acts not in frequencies:
+            frequencies[acts] = list()
+        frequencies[acts].append(freq)
+    return frequencies
+
+def filter_frequencies_by_threshold(
+    frequencies: dict[tuple[str, str], list[float]], threshold: float=0.5
+) -> dfg_type:
+    '''
+    Count, for each key, how many units have a frequency greater than
+    the maximum frequency of the key times the threshold.
+
+    Parameters
+    ------------
+    frequencies
+        The frequencies of each key on the units
+    threshold
+        The threshold to aggregate the frequencies. Defaults to 0.5.
+
+    Returns
+    ------------
+    dfg_type: The aggregated frequencies.
+    '''
+    thresholds = { act: max(freq) * threshold
+                  for act, freq in frequencies.items() }
+    aggregated: dict[tuple[str, str], int] = dict()
+    for act, act_frequencies in frequencies.items():
+        count = [1 for f in act_frequencies if f >= thresholds[act]]
+        aggregated[act] = sum(count)
+    return aggregated
+
+def aggregate_by_threshold(frequency_list: Iterable[dfg_type],
                            threshold: float=0.5) -> dfg_type:
     '''
     Aggregate the frequencies by a threshold, where the final frequency
@@ -96,18 +234,8 @@ def aggregate_by_threshold(frequency_list: list[dfg_type],
     '''
     frequencies: dict[tuple[str, str], list[float]] = dict()
     for count_info in frequency_list:
-        for acts, freq in count_info.items():
-            if acts not in frequencies:
-                frequencies[acts] = list()
-            frequencies[acts].append(freq)
-
-    thresholds = { act: max(freq) * threshold
-                  for act, freq in frequencies.items() }
-    aggregated: dict[tuple[str, str], int] = dict()
-    for act, frequencies in frequencies.items():
-        count = [1 for f in frequencies if f >= thresholds[act]]
-        aggregated[act] = sum(count)
-    return aggregated
+        update_frequencies(frequencies, count_info)
+    return filter_frequencies_by_threshold(frequencies, threshold)
 
 def get_filtered_edges(dfg: dfg_type, threshold: int
                        ) -> tuple[dfg_type, dfg_type]:
@@ -159,19 +287,21 @@ def join_filtered_edges(dfgs: list[dfg_type]) -> dfg_type:
             joined_edges[key] = joined_edges.get(key, 0) + value
     return joined_edges
 
-def get_comparison_dfg(dataframes: list[pl.DataFrame], threshold: float=0.5,
+def get_comparison_dfg(dataframes: Iterable[unit_source_type],
+                       threshold: float=0.5,
                        filter_count: int=1, percentage: float=0.25, 
                        ) -> dfg_type:
     """
     Get the filtered comparison of the Directly-Follows Graphs of the
     dataframes, where the values are the number of the cases with the edges
     and the values are normalized by the number of cases. Finally it will
-    verify if has islands and merge them, if necessary.
+    verify if has islands and merge them, if necessary. The units are
+    streamed, so only one of them is loaded at a time.
 
     Parameters
     ------------
     dataframes
-        List of dataframes
+        Iterable of unit sources (see load_unit_source)
     threshold
         The threshold to consider a valid relation comparing to the max
         occurrences between the dataframes. Defaults to 0.5.
@@ -185,13 +315,77 @@ def get_comparison_dfg(dataframes: list[pl.DataFrame], threshold: float=0.5,
     ------------
     dict: The comparison of the dfgs
     """
-    start_dfgs, middle_dfgs, end_dfgs = get_splitted_comparison_dfgs(
-        dataframes, percentage)
+    start_freqs, middle_freqs, end_freqs = dict(), dict(), dict()
+    for start_dfg, middle_dfg, end_dfg, _, _ in iter_units_comparison_data(
+        dataframes, percentage):
+        update_frequencies(start_freqs, start_dfg)
+        update_frequencies(middle_freqs, middle_dfg)
+        update_frequencies(end_freqs, end_dfg)
+
+    return filter_comparison_frequencies(start_freqs, middle_freqs,
+                                         end_freqs, threshold, filter_count)
+
+def filter_comparison_frequencies(
+    start_freqs: dict[tuple[str, str], list[float]],
+    middle_freqs: dict[tuple[str, str], list[float]],
+    end_freqs: dict[tuple[str, str], list[float]],
+    threshold: float=0.5, filter_count: int=1
+) -> dfg_type:
+    """
+    Filter the per-edge frequencies of the units into the comparison
+    Directly-Follows Graph, merging the islands if necessary.
 
-    start_edges_count = aggregate_by_threshold(start_dfgs, threshold)
-    middle_edges_count = aggregate_by_threshold(middle_dfgs, threshold)
-    end_edges_count = aggregate_by_threshold(end_dfgs, threshold)
+    Parameters
+    ------------
+    start_freqs
+        The frequencies of the start edges on each unit
+    middle_freqs
+        The frequencies of the middle edges on each unit
+    end_freqs
+        The frequencies of the end edges on each unit
+    threshold
+        The threshold to consider a valid relation comparing to the max
+        occurrences between the dataframes. Defaults to 0.5.
+    filter_count
+        The minimum number of dataframes to be considered. Defaults to 1.
 
+    Returns
+    ------------
+    dict: The comparison of the dfgs
+    """
+    start_edges_count = filter_frequencies_by_threshold(start_freqs,
+                                                        threshold)
+    middle_edges_count = filter_frequencies_by_threshold(middle_freqs,
+                                                         threshold)
+    end_edges_count = filter_frequencies_by_threshold(end_freqs, threshold)
+
+    return filter_comparison_edges_count(start_edges_count,
+                                         middle_edges_count,
+                                         end_edges_count, filter_count)
+
+def filter_comparison_edges_count(start_edges_count: dfg_type,
+                                  middle_edges_count: dfg_type,
+                                  end_edges_count: dfg_type,
+                                  filter_count: int=1) -> dfg_type:
+    """
+    Filter the number of units where each edge passes the threshold into
+    the comparison Directly-Follows Graph, merging the islands if necessary.
+
+    Parameters
+    ------------
+    start_edges_count
+        The number of units where each start edge passes the threshold
+    middle_edges_count
+        The number of units where each middle edge passes the threshold
+    end_edges_count
+        The number of units where each end edge passes the threshold
+    filter_count
+        The minimum number of dataframes to be considered. Defaults to 1.
+
+    Returns
+    ------------
+    dict: The comparison of the dfgs
+    """
     mf_edges, mt_edges = get_filtered_edges(middle_edges_count,
                                             filter_count)
     sf_edges, st_edges = get_filtered_edges(start_edges_count,
@@ -202,33 +396,33 @@ def get_comparison_dfg(dataframes: list[pl.DataFrame], threshold: float=0.5,
     filtered_edges = join_filtered_edges([mf_edges, sf_edges, ef_edges])
     tolerance_edges = join_filtered_edges([mt_edges, st_edges, et_edges])
 
-    clusters: list[set[str]] = list()
-
-    for edge in filtered_edges:
-        clusters = add_edge_to_islands(clusters, edge)
-
-    new_edges = get_edges_to_merge_islands(clusters, tolerance_edges)
+    new_edges = get_edges_to_merge_dfg_islands(filtered_edges,
+                                               tolerance_edges)
     filtered_edges = join_filtered_edges([filtered_edges, new_edges])
 
     return filtered_edges
-    
 
-def get_comparison_start_end_acts(dataframes: list[pl.DataFrame],
-                                  threshold: float=0.5, filter_count: int=1
-                                  ) -> tuple[list[str], list[str]]:
+def filter_comparison_start_end_acts(
+    start_frequencies: dict[str, list[int]],
+    end_frequencies: dict[str, list[int]],
+    threshold: float=0.5, filter_count: int=1
+) -> tuple[list[str], list[str]]:
     """
-    Get the comparison of the start and end activities of the dataframes.
+    Filter the start and end activities count of each unit into the
+    comparison start and end activities.
 
     Parameters
     ------------
-    dataframes
-        List of dataframes
+    start_frequencies
+        The count of each start activity on each unit
+    end_frequencies
+        The count of each end activity on each unit
     threshold
         The threshold to consider a valid relation comparing to the max
         occurrences between the dataframes. Defaults to 0.5.
     filter_count
         The minimum number of dataframes to be considered. Defaults to 1.
-    
+
     Returns
     ------------
     tuple[list[str], list[str]]: The comparison of the start and end activities
@@ -242,16 +436,157 @@ def get_comparison_start_end_acts(dataframes: list[pl.DataFrame],
                 break
         return activities
 
-    start_activities: list[dict[str, int]] = list()
-    end_activities: list[dict[str, int]] = list()
-    for dataframe in dataframes:
-        sa, ea = get_start_end_activities_count(dataframe)
-        start_activities.append(sa)
-        end_activities.append(ea)
-
-    filtered_sa = aggregate_by_threshold(start_activities, threshold)
-    filtered_ea = aggregate_by_threshold(end_activities, threshold)
+    filtered_sa = filter_frequencies_by_threshold(start_frequencies,
+                                                  threshold)
+    filtered_ea = filter_frequencies_by_threshold(end_frequencies,
+                                                  threshold)
     start_activities: list[str] = filter_acts(filtered_sa)
     end_activities: list[str] = filter_acts(filtered_ea)
 
     return list(set(start_activities)), list(set(end_activities))
+
+
+def get_comparison_start_end_acts(dataframes: Iterable[unit_source_type],
+                                  threshold: float=0.5, filter_count: int=1
+                                  ) -> tuple[list[str], list[str]]:
+    """
+    Get the comparison of the start and end activities of the dataframes.
+    The units are streamed, so only one of them is loaded at a time.
+
+    Parameters
+    ------------
+    dataframes
+        Iterable of unit sources (see load_unit_source)
+    threshold
+        The threshold to consider a valid relation comparing to the max
+        occurrences between the dataframes. Defaults to 0.5.
+    filter_count
+        The minimum number of dataframes to be considered. Defaults to 1.
+    
+    Returns
+    ------------
+    tuple[list[str], list[str]]: The comparison of the start and end activities
+    """
+    start_frequencies: dict[str, list[int]] = dict()
+    end_frequencies: dict[str, list[int]] = dict()
+    for source in dataframes:
+        sa, ea = get_start_end_activities_count(load_unit_source(source))
+        update_frequencies(start_frequencies, sa)
+        update_frequencies(end_frequencies, ea)
+
+    return filter_comparison_start_end_acts(start_frequencies,
+                                            end_frequencies, threshold,
+                                            filter_count)
+
+def get_comparison_dfg_and_start_end_acts(
+    dataframes: Iterable[unit_source_type], threshold: float=0.5,
+    filter_count: int=1, percentage: float=0.25
+) -> tuple[dfg_type, tuple[list[str], list[str]]]:
+    """
+    Get the comparison Directly-Follows Graph and the comparison start and
+    end activities of the units, scanning the events of each unit only
+    once. It's equivalent to call get_comparison_dfg and
+    get_comparison_start_end_acts, but also works with one-shot iterators.
+
+    Parameters
+    ------------
+    dataframes
+        Iterable of unit sources (see load_unit_source)
+    threshold
+        The threshold to consider a valid relation comparing to the max
+        occurrences between the dataframes. Defaults to 0.5.
+    filter_count
+        The minimum number of dataframes to be considered. Defaults to 1.
+    percentage
+        Percentage of the traces to be considered as start and end dfgs.
+        Defaults to 0.25 (to split into 3 parts because ceil function)
+
+    Returns
+    ------------
+    tuple[dfg_type, tuple[list[str], list[str]]]: The comparison of the dfgs
+    and the comparison of the start and end activities
+    """
+    comparison_dfg, start_end_acts, _ = get_comparison_data(
+        dataframes, threshold, filter_count, percentage)
+    return comparison_dfg, start_end_acts
+
+def get_comparison_data(dataframes: Iterable[unit_source_type],
+                        threshold: float=0.5, filter_count: int=1,
+                        percentage: float=0.25
+                        ) -> tuple[dfg_type, tuple[list[str], list[str]],
+                                   pl.DataFrame]:
+    """
+    Get the comparison Directly-Follows Graph, the comparison start and end
+    activities and the participation of each unit on the comparison edges,
+    scanning the events of each unit only once. The normalized frequencies
+    of the units are kept as a columnar table, where the threshold of each
+    edge is computed in a single vectorized pass.
+
+    Parameters
+    ------------
+    dataframes
+        Iterable of unit sources (see load_unit_source)
+    threshold
+        The threshold to consider a valid relation comparing to the max
+        occurrences between the dataframes. Defaults to 0.5.
+    filter_count
+        The minimum number of dataframes to be considered. Defaults to 1.
+    percentage
+        Percentage of the traces to be considered as start and end dfgs.
+        Defaults to 0.25 (to split into 3 parts because ceil function)
+
+    Returns
+    ------------
+    tuple[dfg_type, tuple[list[str], list[str]], pl.DataFrame]: The
+    comparison of the dfgs, the comparison of the start and end activities
+    and the participation table of the comparison edges, with the columns
+    part (start, middle or end), source, target, unit (the index of the
+    unit), frequency (percentage of the unit cases with the edge) and
+    passes (if the frequency passes the threshold of the edge)
+    """
+    parts, units, sources, targets, frequencies = [], [], [], [], []
+    start_frequencies, end_frequencies = dict(), dict()
+    for unit, (start_dfg, middle_dfg, end_dfg, sa, ea) in enumerate(
+        iter_units_comparison_data(dataframes, percentage)):
+        for part, dfg in zip(COMPARISON_PARTS,
+                             (start_dfg, middle_dfg, end_dfg)):
+            for (source, target), frequency in dfg.items():
+                parts.append(part)
+                units.append(unit)
+                sources.append(source)
+                targets.append(target)
+                frequencies.append(frequency)
+        update_frequencies(start_frequencies, sa)
+        update_frequencies(end_frequencies, ea)
+
+    edge_columns = ["part", "source", "target"]
+    participation = pl.DataFrame({
+        "part": parts, "source": sources, "target": targets,
+        "unit": units, "frequency": frequencies,
+    }, schema={
+        "part": pl.Utf8, "source": pl.Utf8, "target": pl.Utf8,
+        "unit": pl.UInt32, "frequency": pl.Float64,
+    }).with_columns((pl.col("frequency") >= pl.col("frequency").max()
+                     .over(edge_columns) * threshold).alias("passes"))
+
+    edges_count: dict[str, dfg_type] = { part: dict()
+                                         for part in COMPARISON_PARTS }
+    for part, source, target, count in (participation
+        .group_by(edge_columns, maintain_order=True)
+        .agg(pl.col("passes").sum()).iter_rows()):
+        edges_count[part][(source, target)] = count
+
+    comparison_dfg = filter_comparison_edges_count(
+        edges_count["start"], edges_count["middle"], edges_count["end"],
+        filter_count)
+    start_end_acts = filter_comparison_start_end_acts(
+        start_frequencies, end_frequencies, threshold, filter_count)
+
+    comparison_edges = pl.DataFrame({
+        "source": [source for source, _ in comparison_dfg],
+        "target": [target for _, target in comparison_dfg],
+    }, schema={ "source": pl.Utf8, "target": pl.Utf8 })
+    participation = participation.join(comparison_edges, how="semi",
+                                       on=["source", "target"])
+
+    return comparison_dfg, start_end_acts, participation
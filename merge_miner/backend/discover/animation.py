@@ -1,10 +1,19 @@
-from .types import AnimationData, CircleStep, GetAnimationInfoReturn
+from .types import (AnimationData, CircleStep, GetAnimationInfoReturn,
+                    AnimationActivityData, AnimationPayloadManifest,
+                    AnimationPayloadEdge, AnimationPayloadColumn,
+                    AnimationChunk, AnimationBucketCount,
+                    SampledAnimationData)
+from ..polars.performance import WINDOW_INTERVALS
+from .discover_graphviz.node_ids import get_activity_hash, get_node_id
 from ..constants import ACTIVITY_NAME, TIMESTAMP_NAME, CASE_CONCEPT_NAME
 from datetime import datetime, timedelta
 from ..types import dfg_type
+from typing import Hashable, Iterable, Iterator
+from collections import OrderedDict
 from functools import reduce
-import importlib, logging
+import importlib, logging, io, threading
 import polars as pl
+import numpy as np
 
 try:
     from extend_polars import get_animation_data_rs
@@ -12,6 +21,9 @@ except ImportError:
     logging.error(f"{__name__}: extend_polars.get_animation_data_rs not found.")
 
 DAYS_IN_SECONDS: float = 60 * 60 * 24
+ANIMATION_PAYLOAD_FORMATS = ("buffers", "arrow")
+# seed of the case hashes of the sampling, fixed to keep it deterministic
+SAMPLING_SEED = 42
 
 def time_elapsed(before_date: datetime, current_date: datetime) -> float:
     """
@@ -65,7 +77,7 @@ def get_animation_data(event_log: pl.DataFrame, freq_dfg: dfg_type,
 
         for i in range(activity_series_df.len()):
             act1 = activity_series_df[i-1]
-            act_hash = "n" + str(hash(act1))
+            act_hash = get_node_id(act1)
             activities.append(act_hash)
             if i == 0: continue
             
@@ -82,7 +94,7 @@ def get_animation_data(event_log: pl.DataFrame, freq_dfg: dfg_type,
                 continue
 
             if (act1, act2) in freq_dfg:
-                key = act_hash + "n" + str(hash(act2))
+                key = act_hash + get_node_id(act2)
                 edges_id.add(key)
             else:
                 key = "unsigned"
@@ -110,30 +122,274 @@ def get_animation_data(event_log: pl.DataFrame, freq_dfg: dfg_type,
         "edges": edges,
     } 
 
-def animation_data_handler(dataframe: pl.DataFrame, freq_dfg: dfg_type,
-                           perf_dfg: dfg_type, activity_count: dict[str, int]
-                           ) -> AnimationData:
+def get_activities_ids(activities: Iterable[str]) -> dict[str, str]:
     """
-    Get the information to be used in the animation and choose the algorithm
-    to use to get the data (Rust or Python). Finally, return the parsed data.
+    Get the id of the node of each activity, as used on the graphviz.
 
     Args:
-        dataframe (pl.DataFrame): The event log
+        activities (Iterable[str]): The activities
+
+    Returns:
+        dict[str, str]: The node id of each activity
+    """
+    return { act: get_node_id(act) for act in activities }
+
+def get_animation_steps(event_log: pl.DataFrame, freq_dfg: dfg_type,
+                        dfg_activities: list[str]) -> pl.DataFrame:
+    """
+    Get the steps of the animation (the movements of the cases) as a
+    table, with the same rules of get_animation_data: the cases are
+    ordered by their first event on the (timestamp sorted) event log and
+    the cases are only counted after the first step on a DFG edge.
+
+    Args:
+        event_log (pl.DataFrame): The event log sorted by timestamp
         freq_dfg (dfg_type): The Directly-Follows Graph
-        perf_dfg (dfg_type): The Performance Directly-Follows Graph
-        activity_count (dict[str, int]): The activities frequency
-    
+        dfg_activities (list[str]): The activities in the DFG
+
     Returns:
-        AnimationData: The data to be used in the animation
+        pl.DataFrame: The steps ordered by case and position, with the
+        case_index, case_number (the cases counter of the step id),
+        position, source, target, signed (if the edge is in the DFG),
+        last_timestamp, current_timestamp, timestamp (seconds), startTime
+        and duration (days), theFirstOne and theLastOne columns
     """
-    for edge in perf_dfg.copy():
-        if edge not in freq_dfg:
-            del perf_dfg[edge]
-    sorted_items = sorted(perf_dfg.values())
-    median_durations = (0, 0)
-    if len(sorted_items) > 0:
-        median_durations = (sorted_items[0], sorted_items[-1])
+    steps = get_base_animation_steps(event_log, dfg_activities)
+    return sign_animation_steps(
+        steps, freq_dfg, event_log.get_column(CASE_CONCEPT_NAME).n_unique())
+
+def get_base_animation_steps(event_log: pl.DataFrame,
+                             dfg_activities: list[str]) -> pl.DataFrame:
+    """
+    Get the steps of get_animation_steps that don't depend on the DFG
+    edges (without the signed and case_number columns), which only change
+    when the activities of the DFG change.
+
+    Args:
+        event_log (pl.DataFrame): The event log sorted by timestamp
+        dfg_activities (list[str]): The activities in the DFG
 
+    Returns:
+        pl.DataFrame: The steps ordered by case and position
+    """
+    events = (event_log.lazy()
+        .select(CASE_CONCEPT_NAME, pl.col(ACTIVITY_NAME).cast(pl.Utf8),
+                TIMESTAMP_NAME)
+        .with_row_index("row")
+        .with_columns(pl.col("row").min().over(CASE_CONCEPT_NAME)
+                      .alias("case_row"))
+        .sort("case_row", "row")
+        .with_columns(pl.col("case_row").rank("dense").cast(pl.Int64)
+                      .alias("case_index"),
+                      pl.int_range(pl.len(), dtype=pl.Int64).alias("row"))
+        .with_columns(
+            (pl.col("row") - pl.col("row").min().over("case_index"))
+            .alias("position"),
+            pl.len().over("case_index").cast(pl.Int64).alias("length"))
+        .collect())
+    if events.height == 0:
+        first_case_date = None
+    else:
+        first_case_date = events.get_column(TIMESTAMP_NAME).min()
+
+    steps = (events.lazy()
+        .with_columns(
+            pl.col(ACTIVITY_NAME).shift(1).alias("source"),
+            pl.col(TIMESTAMP_NAME).shift(1).alias("last_timestamp"))
+        .filter(pl.col("position") > 0)
+        .rename({ ACTIVITY_NAME: "target",
+                  TIMESTAMP_NAME: "current_timestamp" })
+        .filter(pl.col("source").is_in(dfg_activities)
+                | pl.col("target").is_in(dfg_activities))
+        .sort("case_index", "position")
+        .collect())
+    return add_steps_times(steps, first_case_date).select(
+        "case_index", "position", "source", "target", "last_timestamp",
+        "current_timestamp", "timestamp", "startTime", "duration",
+        "theFirstOne", "theLastOne")
+
+def add_steps_times(steps: pl.DataFrame, first_case_date: datetime | None
+                    ) -> pl.DataFrame:
+    """
+    Add the timestamp (seconds), startTime and duration (days),
+    theFirstOne and theLastOne columns to the steps, from their
+    last_timestamp, current_timestamp, position and length (of the case).
+    """
+    microseconds = lambda before, after: (
+        (after - before).dt.total_microseconds().to_numpy())
+    # numpy true division, as timedelta.total_seconds() (polars divides by
+    # the reciprocal of scalars, which differs on the last digit)
+    seconds = microseconds(steps.get_column("last_timestamp"),
+                           steps.get_column("current_timestamp")) / 1e6
+    start_seconds = (steps.get_column("last_timestamp") - first_case_date
+                     ).dt.total_microseconds().to_numpy() / 1e6
+    return steps.with_columns(
+        pl.Series("timestamp", seconds, dtype=pl.Float64),
+        pl.Series("startTime", start_seconds / DAYS_IN_SECONDS,
+                  dtype=pl.Float64),
+        pl.Series("duration", np.maximum(0.3, seconds / DAYS_IN_SECONDS),
+                  dtype=pl.Float64),
+        (pl.col("position") == 1).alias("theFirstOne"),
+        (pl.col("position") == pl.col("length") - 1).alias("theLastOne"))
+
+def get_dfg_edges(freq_dfg: dfg_type) -> pl.DataFrame:
+    """The edges of the DFG as a table, with a signed column (all true)."""
+    return pl.DataFrame(
+        { "source": [a for a, _ in freq_dfg],
+          "target": [b for _, b in freq_dfg] },
+        schema={ "source": pl.Utf8, "target": pl.Utf8 }
+    ).with_columns(pl.lit(True).alias("signed"))
+
+def sign_animation_steps(steps: pl.DataFrame, freq_dfg: dfg_type,
+                         cases_amount: int) -> pl.DataFrame:
+    """
+    Key the steps of get_base_animation_steps against the DFG edges, with
+    a join: the signed column (if the edge is in the DFG) and the
+    case_number, the counter of the cases that starts after the first
+    signed step.
+
+    Args:
+        steps (pl.DataFrame): The steps of get_base_animation_steps
+        freq_dfg (dfg_type): The Directly-Follows Graph
+        cases_amount (int): The amount of cases of the event log
+
+    Returns:
+        pl.DataFrame: The steps with the columns of get_animation_steps
+    """
+    # the left join keeps the order of the steps
+    steps = (steps.lazy()
+        .join(get_dfg_edges(freq_dfg).lazy(), on=["source", "target"],
+              how="left")
+        .with_columns(pl.col("signed").fill_null(False))
+        .collect())
+
+    # the cases are ranked from 1 by their first event, so the counter is
+    # computed over all the indexes (including the cases without steps)
+    signed_cases = np.zeros(cases_amount, dtype=np.int64)
+    signed_cases[steps.filter(pl.col("signed"))
+                      .get_column("case_index").to_numpy() - 1] = 1
+    counted = np.maximum.accumulate(signed_cases)
+    case_numbers = pl.Series(np.cumsum(counted) - counted, dtype=pl.Int64)
+
+    return steps.with_columns(
+        pl.lit(case_numbers).gather(pl.col("case_index") - 1)
+          .alias("case_number")
+    ).select("case_index", "case_number", "position", "source", "target",
+             "signed", "last_timestamp", "current_timestamp", "timestamp",
+             "startTime", "duration", "theFirstOne", "theLastOne")
+
+def add_steps_keys(steps: pl.DataFrame, activities_ids: dict[str, str]
+                   ) -> pl.DataFrame:
+    """
+    Add the node id of the source activity (activity column) and the edge
+    key of each step, where the steps out of the DFG are "unsigned".
+    """
+    source_id = pl.col("source").replace(activities_ids)
+    return steps.with_columns(
+        source_id.alias("activity"),
+        pl.when(pl.col("signed"))
+          .then(source_id + pl.col("target").replace(activities_ids))
+          .otherwise(pl.lit("unsigned")).alias("key"))
+
+def get_cases_info(event_log: pl.DataFrame, steps: pl.DataFrame
+                   ) -> tuple[datetime | None, datetime | None, int]:
+    """
+    Get the first case date, the last case date (the last event of the
+    last case to start) and the total cases of the animation, as
+    get_animation_data.
+
+    Args:
+        event_log (pl.DataFrame): The event log sorted by timestamp
+        steps (pl.DataFrame): The steps from get_animation_steps
+
+    Returns:
+        tuple[datetime | None, datetime | None, int]: The first and last
+        case dates and the total cases
+    """
+    if event_log.height == 0:
+        return None, None, 0
+
+    first_case_date = event_log.get_column(TIMESTAMP_NAME).min()
+    last_case = (event_log.lazy()
+        .with_row_index("row")
+        .group_by(CASE_CONCEPT_NAME)
+        .agg(pl.col("row").min(), pl.col(TIMESTAMP_NAME).last())
+        .sort("row").last().collect())
+    total_cases = get_total_cases(
+        steps, event_log.get_column(CASE_CONCEPT_NAME).n_unique())
+    return (first_case_date, last_case.get_column(TIMESTAMP_NAME).item(),
+            total_cases)
+
+def get_total_cases(steps: pl.DataFrame, cases_amount: int) -> int:
+    """
+    Get the total cases of the animation, the cases from the first one
+    with a signed step.
+    """
+    signed_cases = (steps.filter(pl.col("signed"))
+                         .get_column("case_index"))
+    if len(signed_cases) == 0:
+        return 0
+    return cases_amount - signed_cases.min() + 1
+
+def get_animation_data_polars(event_log: pl.DataFrame, freq_dfg: dfg_type,
+                              dfg_activities: list[str]
+                              ) -> GetAnimationInfoReturn:
+    """
+    Columnar version of get_animation_data (used without the Rust
+    extension), built from get_animation_steps with the same output.
+
+    Args:
+        event_log (pl.DataFrame): The event log sorted by timestamp
+        freq_dfg (dfg_type): The Directly-Follows Graph
+        dfg_activities (list[str]): The activities in the DFG
+
+    Returns:
+        GetAnimationInfoReturn: The data to be used in the animation
+    """
+    if event_log.height == 0:
+        return { "first_case_date": None, "last_case_date": None,
+                 "total_cases": 0, "edges": { "unsigned": [] } }
+
+    steps = get_animation_steps(event_log, freq_dfg, dfg_activities)
+    activities_ids = get_activities_ids(set(steps.get_column("source"))
+                                        | set(steps.get_column("target")))
+    first_case_date, last_case_date, total_cases = get_cases_info(
+        event_log, steps)
+
+    return {
+        "first_case_date": first_case_date,
+        "last_case_date": last_case_date,
+        "total_cases": total_cases,
+        "edges": get_steps_edges(add_steps_keys(steps, activities_ids)),
+    }
+
+def get_steps_edges(steps: pl.DataFrame) -> dict[str, list[CircleStep]]:
+    """
+    Group the steps (with the keys of add_steps_keys) by edge, in the
+    format of the animation, keeping the order of the steps.
+    """
+    steps = steps.with_columns(
+        pl.format("circle_{}_{}", "case_number", "position").alias("id"))
+    edges: dict[str, list[CircleStep]] = { "unsigned": [] }
+    for key_steps in steps.partition_by("key", maintain_order=True):
+        edges[key_steps.get_column("key")[0]] = key_steps.select(
+            "activity", "theFirstOne", "timestamp", "startTime",
+            "duration", "id", "theLastOne").to_dicts()
+    return edges
+
+def prepare_animation_log(dataframe: pl.DataFrame, freq_dfg: dfg_type
+                          ) -> tuple[pl.DataFrame, list[str]]:
+    """
+    Keep only the events of the DFG activities, sorted by timestamp.
+
+    Args:
+        dataframe (pl.DataFrame): The event log
+        freq_dfg (dfg_type): The Directly-Follows Graph
+
+    Returns:
+        tuple[pl.DataFrame, list[str]]: The ordered event log and the
+        activities in the DFG
+    """
     activity_list = set()
     for activities in freq_dfg.keys():
         activity_list = activity_list.union(activities)
@@ -146,12 +402,329 @@ def animation_data_handler(dataframe: pl.DataFrame, freq_dfg: dfg_type,
     
     dfg_activities = list(reduce(lambda x, y: set(x).union(y),
                                  freq_dfg.keys()))
-    if importlib.find_loader('extend_polars') is not None:
+    return ordered_eventlog, dfg_activities
+
+def get_median_durations(freq_dfg: dfg_type, perf_dfg: dfg_type
+                         ) -> tuple[float, float]:
+    """
+    Get the min and max durations of the performance dfg edges that are
+    in the frequency dfg (the edges out of it are removed of perf_dfg).
+    """
+    for edge in perf_dfg.copy():
+        if edge not in freq_dfg:
+            del perf_dfg[edge]
+    sorted_items = sorted(perf_dfg.values())
+    median_durations = (0, 0)
+    if len(sorted_items) > 0:
+        median_durations = (sorted_items[0], sorted_items[-1])
+    return median_durations
+
+def get_nodes_frequency(activity_count: dict[str, int]
+                        ) -> list[AnimationActivityData]:
+    return [{
+        "id": get_node_id(key), "frequency": value
+    } for key, value in activity_count.items()]
+
+def get_animation_events(dataframe: pl.DataFrame) -> pl.DataFrame:
+    """
+    Get the events of all the activities of the event log, numbered by
+    their timestamp (the row column) and grouped by case, with the cases
+    ordered by their first event (the case_row column).
+
+    Args:
+        dataframe (pl.DataFrame): The event log
+
+    Returns:
+        pl.DataFrame: The events with the case_row, row, activity and
+        timestamp columns
+    """
+    return (dataframe.lazy()
+        .select(CASE_CONCEPT_NAME, pl.col(ACTIVITY_NAME).cast(pl.Utf8),
+                TIMESTAMP_NAME)
+        .sort(TIMESTAMP_NAME, maintain_order=True)
+        .with_row_index("row")
+        .with_columns(pl.col("row").min().over(CASE_CONCEPT_NAME)
+                        .alias("case_row"))
+        .sort("case_row", "row")
+        .select("case_row", "row", ACTIVITY_NAME, TIMESTAMP_NAME)
+        .collect())
+
+def get_events_animation_steps(events: pl.DataFrame,
+                               dfg_activities: Iterable[str]
+                               ) -> tuple[pl.DataFrame, datetime | None,
+                                          datetime | None, int]:
+    """
+    Get the steps of get_base_animation_steps from the events of
+    get_animation_events, keeping the events of the DFG activities. The
+    events stay grouped by case, so the positions, the lengths and the
+    case indexes (the cases ranked by their first kept event) are computed
+    with numpy, without sorting the event log again.
+
+    Args:
+        events (pl.DataFrame): The events of get_animation_events
+        dfg_activities (Iterable[str]): The activities in the DFG
+
+    Returns:
+        tuple[pl.DataFrame, datetime | None, datetime | None, int]: The
+        steps, the first and last case dates and the amount of cases
+    """
+    events = events.filter(pl.col(ACTIVITY_NAME).is_in(list(dfg_activities)))
+    case_rows = events.get_column("case_row").to_numpy()
+    first = np.ones(events.height, dtype=bool)
+    first[1:] = case_rows[1:] != case_rows[:-1]
+    starts = np.flatnonzero(first)
+    lengths = np.diff(np.append(starts, events.height))
+    cases = np.cumsum(first) - 1
+
+    case_order = np.argsort(events.get_column("row").to_numpy()[starts],
+                            kind="stable")
+    case_indexes = np.empty(len(starts), dtype=np.int64)
+    case_indexes[case_order] = np.arange(1, len(starts) + 1)
+
+    first_case_date, last_case_date = None, None
+    if events.height > 0:
+        timestamps = events.get_column(TIMESTAMP_NAME)
+        first_case_date = timestamps.min()
+        last_case = case_order[-1]
+        last_case_date = timestamps[int(starts[last_case]
+                                        + lengths[last_case] - 1)]
+
+    steps = (events
+        .with_columns(
+            pl.Series("case_index", case_indexes[cases], dtype=pl.Int64),
+            pl.Series("position", np.arange(events.height) - starts[cases],
+                      dtype=pl.Int64),
+            pl.Series("length", lengths[cases], dtype=pl.Int64),
+            pl.col(ACTIVITY_NAME).shift(1).alias("source"),
+            pl.col(TIMESTAMP_NAME).shift(1).alias("last_timestamp"))
+        .filter(pl.Series(~first))
+        .rename({ ACTIVITY_NAME: "target",
+                  TIMESTAMP_NAME: "current_timestamp" })
+        .sort("case_index", "position"))
+    steps = add_steps_times(steps, first_case_date).select(
+        "case_index", "position", "source", "target", "last_timestamp",
+        "current_timestamp", "timestamp", "startTime", "duration",
+        "theFirstOne", "theLastOne")
+    return steps, first_case_date, last_case_date, len(starts)
+
+class AnimationStepsCache:
+    """
+    LRU cache of the events of the animation (see get_animation_events) by
+    event log. The steps of each DFG are derived from the cached events
+    with get_events_animation_steps and keyed with sign_animation_steps,
+    so the refreshes that change the edges or the activities (e.g.
+    max_edges or keep_events) don't sort the event log nor rank its cases
+    again. The cache is shared by the threads of the server, so its
+    entries are only accessed with the lock.
+    """
+    def __init__(self, max_entries: int = 4, max_events: int = 5_000_000):
+        """
+        Args:
+            max_entries (int, optional): Maximum event logs kept. Defaults
+                to 4.
+            max_events (int, optional): Maximum events kept on all the
+                entries, the events of a larger event log aren't cached.
+                Defaults to 5_000_000.
+        """
+        self.max_entries = max_entries
+        self.max_events = max_events
+        self.entries: OrderedDict[Hashable, pl.DataFrame | None]
+        self.entries = OrderedDict()
+        self.events_amount = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.events_amount = 0
+
+    @staticmethod
+    def log_fingerprint(dataframe: pl.DataFrame) -> tuple[int, int]:
+        """The fingerprint of the columns of the event log used."""
+        rows_hash = (dataframe.select(CASE_CONCEPT_NAME, ACTIVITY_NAME,
+                                      TIMESTAMP_NAME)
+                              .hash_rows(SAMPLING_SEED).sum())
+        return dataframe.height, rows_hash
+
+    def put(self, log_key: Hashable, events: pl.DataFrame | None) -> None:
+        """
+        Store the events of the event log (None only records that it was
+        seen), evicting the least recently used entries.
+        """
+        height = 0 if events is None else events.height
+        if self.max_entries == 0 or height > self.max_events:
+            return
+        with self.lock:
+            if self.entries.get(log_key) is not None:
+                self.events_amount -= self.entries[log_key].height
+            self.entries[log_key] = events
+            self.entries.move_to_end(log_key)
+            self.events_amount += height
+            while (len(self.entries) > self.max_entries
+                   or self.events_amount > self.max_events):
+                _, evicted = self.entries.popitem(last=False)
+                if evicted is not None:
+                    self.events_amount -= evicted.height
+
+    def seen(self, log_key: Hashable) -> bool:
+        """
+        Whether the event log was already requested, recording it (without
+        its events) otherwise.
+        """
+        with self.lock:
+            if log_key in self.entries:
+                self.entries.move_to_end(log_key)
+                return True
+        self.put(log_key, None)
+        return False
+
+    def get_steps(self, dataframe: pl.DataFrame, freq_dfg: dfg_type,
+                  log_key: Hashable | None = None
+                  ) -> tuple[pl.DataFrame, datetime | None,
+                             datetime | None, int]:
+        """
+        Get the steps of get_animation_steps and the cases info of
+        get_cases_info, from the cached events when the event log was
+        already seen.
+
+        Args:
+            dataframe (pl.DataFrame): The event log (not filtered)
+            freq_dfg (dfg_type): The Directly-Follows Graph
+            log_key (Hashable | None, optional): The identifier of the
+                event log (e.g. the unit). Defaults to the fingerprint of
+                the event log.
+
+        Returns:
+            tuple[pl.DataFrame, datetime | None, datetime | None, int]: The
+            steps, the first and last case dates and the total cases
+        """
+        if log_key is None:
+            log_key = self.log_fingerprint(dataframe)
+        with self.lock:
+            events = self.entries.get(log_key)
+            if log_key in self.entries:
+                self.entries.move_to_end(log_key)
+        if events is None:
+            events = get_animation_events(dataframe)
+            self.put(log_key, events)
+
+        dfg_activities = { act for edge in freq_dfg for act in edge }
+        steps, first_case_date, last_case_date, cases_amount = (
+            get_events_animation_steps(events, dfg_activities))
+        steps = sign_animation_steps(steps, freq_dfg, cases_amount)
+        return (steps, first_case_date, last_case_date,
+                get_total_cases(steps, cases_amount))
+
+animation_steps_cache = AnimationStepsCache()
+
+def sample_animation_steps(steps: pl.DataFrame, max_tokens: int,
+                           every: str = "monthly"
+                           ) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Level of detail of the animation: keep at most max_tokens steps of
+    each edge in each time bucket and summarize the others as counts. The
+    kept steps are the ones of the cases with the lowest hashes, so the
+    sampling is deterministic and stratified by case (a sampled case
+    tends to be kept on all its edges). The unsigned steps (out of the
+    DFG) are only counted.
+
+    Args:
+        steps (pl.DataFrame): The steps with the keys of add_steps_keys
+        max_tokens (int): The maximum steps per edge per bucket
+        every (str, optional): The size of the buckets, as in
+            iter_animation_chunks. Defaults to "monthly".
+
+    Returns:
+        tuple[pl.DataFrame, pl.DataFrame]: The sampled steps (in the
+        original order) and the counts, with the edge, start_time (of the
+        bucket), total and sampled columns
+    """
+    every = WINDOW_INTERVALS.get(every, every)
+    steps = (steps.lazy()
+        .with_columns(pl.col("last_timestamp").dt.truncate(every)
+                        .alias("start_time"),
+                      pl.col("case_index").hash(SAMPLING_SEED)
+                        .alias("case_hash"))
+        .with_columns((pl.col("signed")
+                       & (pl.col("case_hash").rank("ordinal")
+                          .over("key", "start_time") <= max_tokens))
+                      .alias("sampled"))
+        .collect())
+
+    counts = (steps.group_by("key", "start_time")
+        .agg(pl.len().alias("total"), pl.col("sampled").sum())
+        .rename({ "key": "edge" })
+        .sort("start_time", "edge"))
+    return (steps.filter(pl.col("sampled"))
+                 .drop("start_time", "case_hash", "sampled"), counts)
+
+def animation_data_handler(dataframe: pl.DataFrame, freq_dfg: dfg_type,
+                           perf_dfg: dfg_type, activity_count: dict[str, int],
+                           max_tokens: int | None = None,
+                           tokens_bucket: str = "monthly",
+                           steps_cache: AnimationStepsCache | None = None
+                           ) -> AnimationData | SampledAnimationData:
+    """
+    Get the information to be used in the animation and choose the algorithm
+    to use to get the data (Rust or Python). Finally, return the parsed data.
+
+    Args:
+        dataframe (pl.DataFrame): The event log
+        freq_dfg (dfg_type): The Directly-Follows Graph
+        perf_dfg (dfg_type): The Performance Directly-Follows Graph
+        activity_count (dict[str, int]): The activities frequency
+        max_tokens (int | None, optional): If specified, the level of
+            detail mode (see sample_animation_steps): at most max_tokens
+            steps per edge per bucket, with the counts of the steps on the
+            "counts" key. Defaults to None.
+        tokens_bucket (str, optional): The size of the buckets of the
+            level of detail mode. Defaults to "monthly".
+        steps_cache (AnimationStepsCache | None, optional): If
+            specified, the steps are derived from the cached events of
+            the event log, so its refreshes don't sort it again. With the
+            Rust extension, the first request of an event log still uses
+            it and only the next ones use the cache. Defaults to None.
+    
+    Returns:
+        AnimationData: The data to be used in the animation
+    """
+    median_durations = get_median_durations(freq_dfg, perf_dfg)
+    counts: list[AnimationBucketCount] | None = None
+    has_extension = importlib.find_loader('extend_polars') is not None
+    log_key = None
+    if steps_cache is not None:
+        log_key = steps_cache.log_fingerprint(dataframe)
+        if has_extension and not steps_cache.seen(log_key):
+            steps_cache = None
+    if max_tokens is not None or steps_cache is not None:
+        if steps_cache is None:
+            steps_cache = AnimationStepsCache(max_entries=0)
+        steps, first_case_date, last_case_date, total_cases = (
+            steps_cache.get_steps(dataframe, freq_dfg, log_key))
+        activities_ids = get_activities_ids(
+            set(steps.get_column("source")) | set(steps.get_column("target")))
+        steps = add_steps_keys(steps, activities_ids)
+        if max_tokens is not None:
+            steps, counts = sample_animation_steps(steps, max_tokens,
+                                                   tokens_bucket)
+            counts = counts.to_dicts()
+        info_data = {
+            "first_case_date": first_case_date,
+            "last_case_date": last_case_date,
+            "total_cases": total_cases,
+            "edges": get_steps_edges(steps),
+        }
+    elif has_extension:
+        ordered_eventlog, dfg_activities = prepare_animation_log(dataframe,
+                                                                 freq_dfg)
         activities_hashes = dict()
         unique_acts = (ordered_eventlog.get_column(ACTIVITY_NAME)
                                        .unique().to_list())
         for act in unique_acts:
-            activities_hashes[act] = str(hash(act))
+            activities_hashes[act] = get_activity_hash(act)
 
         data = get_animation_data_rs(ordered_eventlog, freq_dfg, 
                                      activities_hashes, dfg_activities)
@@ -162,18 +735,18 @@ def animation_data_handler(dataframe: pl.DataFrame, freq_dfg: dfg_type,
             "edges": data[2],
         }
     else:
-        info_data = get_animation_data(ordered_eventlog, freq_dfg,
-                                       dfg_activities)
+        ordered_eventlog, dfg_activities = prepare_animation_log(dataframe,
+                                                                 freq_dfg)
+        info_data = get_animation_data_polars(ordered_eventlog, freq_dfg,
+                                              dfg_activities)
 
-    nodes_frequency = [{
-        "id": "n" + str(hash(key)), "frequency": value
-    } for key, value in activity_count.items()]
+    nodes_frequency = get_nodes_frequency(activity_count)
     
     first_case_date = info_data["first_case_date"]
     last_case_date = info_data["last_case_date"]
     total_duration = time_elapsed(first_case_date, last_case_date)
     
-    return {
+    animation_data = {
         "edges": info_data["edges"],
         "nodes": nodes_frequency,
         "end_time": last_case_date,
@@ -182,3 +755,320 @@ def animation_data_handler(dataframe: pl.DataFrame, freq_dfg: dfg_type,
         "start_time": first_case_date,
         "total_duration": total_duration,
     }
+    if counts is not None:
+        animation_data["counts"] = counts
+    return animation_data
+
+def get_animation_payload(dataframe: pl.DataFrame, freq_dfg: dfg_type,
+                          perf_dfg: dfg_type, activity_count: dict[str, int],
+                          payload_format: str = "buffers",
+                          steps_cache: AnimationStepsCache | None = None
+                          ) -> tuple[AnimationPayloadManifest, bytes]:
+    """
+    Get the animation data as a small JSON manifest and a binary body with
+    the steps as struct-of-arrays, instead of one dict per step. The steps
+    are grouped by edge (the "unsigned" edge first), where the edge i
+    occupies the rows [offset, offset + count) of every column, and the
+    step id is circle_{case}_{position}.
+
+    On the "buffers" format each column is a raw little-endian typed
+    array (startTime, duration and timestamp as float32; case, position
+    and activity as uint32, where activity indexes the activities of the
+    manifest; theFirstOne and theLastOne as bit-packed uint8), aligned to
+    8 bytes, on the offsets of the manifest. On the "arrow" format the
+    body is an Arrow IPC file with the same columns (and the flags as
+    booleans).
+
+    Args:
+        dataframe (pl.DataFrame): The event log
+        freq_dfg (dfg_type): The Directly-Follows Graph
+        perf_dfg (dfg_type): The Performance Directly-Follows Graph
+        activity_count (dict[str, int]): The activities frequency
+        payload_format (str, optional): "buffers" or "arrow".
+            Defaults to "buffers".
+        steps_cache (AnimationStepsCache | None, optional): If specified,
+            the steps are computed with the cache, as in
+            animation_data_handler (e.g. on the refreshes of a view, which
+            skip the dicts of the steps). Defaults to None.
+
+    Returns:
+        tuple[AnimationPayloadManifest, bytes]: The manifest and the body
+    """
+    if payload_format not in ANIMATION_PAYLOAD_FORMATS:
+        raise ValueError(f"{payload_format} is not a valid payload format!")
+
+    median_durations = get_median_durations(freq_dfg, perf_dfg)
+    if steps_cache is not None:
+        steps, first_case_date, last_case_date, total_cases = (
+            steps_cache.get_steps(dataframe, freq_dfg))
+    else:
+        ordered_eventlog, dfg_activities = prepare_animation_log(dataframe,
+                                                                 freq_dfg)
+        steps = get_animation_steps(ordered_eventlog, freq_dfg,
+                                    dfg_activities)
+        first_case_date, last_case_date, total_cases = get_cases_info(
+            ordered_eventlog, steps)
+
+    activities_ids = get_activities_ids(sorted(
+        set(steps.get_column("source")) | set(steps.get_column("target"))))
+    activities = list(activities_ids.values())
+    activity_index = { act_id: i for i, act_id in enumerate(activities) }
+    steps = (add_steps_keys(steps, activities_ids)
+        .with_row_index("row")
+        .with_columns(pl.when(pl.col("key") == "unsigned").then(-1)
+                        .otherwise(pl.col("row").min().over("key"))
+                        .alias("edge_order"))
+        .sort("edge_order", "row")
+        .with_columns(pl.col("activity").replace(activity_index,
+                                                 return_dtype=pl.UInt32)))
+
+    edges_count = (steps.group_by("key", maintain_order=True)
+                        .agg(pl.len().alias("count")))
+    edges: list[AnimationPayloadEdge] = list()
+    offset = 0
+    for key, count in edges_count.iter_rows():
+        edges.append({ "key": key, "offset": offset, "count": count })
+        offset += count
+
+    columns = [("startTime", "startTime", pl.Float32, "<f4"),
+               ("duration", "duration", pl.Float32, "<f4"),
+               ("timestamp", "timestamp", pl.Float32, "<f4"),
+               ("case", "case_number", pl.UInt32, "<u4"),
+               ("position", "position", pl.UInt32, "<u4"),
+               ("activity", "activity", pl.UInt32, "<u4")]
+    manifest_columns: list[AnimationPayloadColumn] = list()
+    if payload_format == "arrow":
+        body = io.BytesIO()
+        steps.select(
+            *[pl.col(column).cast(dtype).alias(name)
+              for name, column, dtype, _ in columns],
+            "theFirstOne", "theLastOne").write_ipc(body)
+        body = body.getvalue()
+    else:
+        buffers = [(name, steps.get_column(column).to_numpy().astype(np_type))
+                   for name, column, _, np_type in columns]
+        buffers += [(flag, np.packbits(steps.get_column(flag).to_numpy()))
+                    for flag in ("theFirstOne", "theLastOne")]
+        chunks, position = list(), 0
+        for name, values in buffers:
+            data = values.tobytes()
+            manifest_columns.append({ "name": name, "offset": position,
+                                      "length": len(data),
+                                      "dtype": values.dtype.str })
+            padding = -len(data) % 8
+            chunks.append(data + b"\0" * padding)
+            position += len(data) + padding
+        body = b"".join(chunks)
+
+    total_duration = 0
+    if first_case_date is not None:
+        total_duration = time_elapsed(first_case_date, last_case_date)
+    manifest: AnimationPayloadManifest = {
+        "format": payload_format,
+        "start_time": first_case_date and first_case_date.isoformat(),
+        "end_time": last_case_date and last_case_date.isoformat(),
+        "total_duration": total_duration,
+        "total_cases": total_cases,
+        "medians": median_durations,
+        "nodes": get_nodes_frequency(activity_count),
+        "activities": activities,
+        "edges": edges,
+        "columns": manifest_columns,
+    }
+    return manifest, body
+
+def get_animation_cases(event_log: pl.DataFrame, freq_dfg: dfg_type
+                        ) -> tuple[pl.DataFrame, int]:
+    """
+    Get the cases of the animation, with the same case_index and
+    case_number of get_animation_steps, without keeping its steps: the
+    successive events are only aggregated by case.
+
+    Args:
+        event_log (pl.DataFrame): The event log sorted by timestamp
+        freq_dfg (dfg_type): The Directly-Follows Graph
+
+    Returns:
+        tuple[pl.DataFrame, int]: The cases (ordered by their first event)
+        with the case_index, case_number, length and last_timestamp (of
+        their last event) columns, and the total cases of the animation
+    """
+    cases = (event_log.lazy()
+        .select(CASE_CONCEPT_NAME, pl.col(ACTIVITY_NAME).cast(pl.Utf8)
+                                     .alias("target"), TIMESTAMP_NAME)
+        .with_row_index("row")
+        .with_columns(pl.col("target").shift(1).over(CASE_CONCEPT_NAME)
+                        .alias("source"))
+        .join(get_dfg_edges(freq_dfg).lazy(), on=["source", "target"],
+              how="left")
+        .group_by(CASE_CONCEPT_NAME)
+        .agg(pl.col("row").min().alias("case_row"),
+             pl.len().cast(pl.Int64).alias("length"),
+             pl.col("signed").any().alias("signed"),
+             pl.col(TIMESTAMP_NAME).last().alias("last_timestamp"))
+        .sort("case_row")
+        .with_columns(pl.int_range(1, pl.len() + 1, dtype=pl.Int64)
+                        .alias("case_index"))
+        .collect())
+
+    # the cases counter starts after the first case with a signed step
+    signed_cases = cases.filter(pl.col("signed")).get_column("case_index")
+    if len(signed_cases) == 0:
+        first_signed, total_cases = cases.height + 1, 0
+    else:
+        first_signed = signed_cases.min()
+        total_cases = cases.height - first_signed + 1
+    cases = cases.with_columns(
+        (pl.col("case_index") - first_signed).clip(lower_bound=0)
+          .alias("case_number"))
+    return (cases.select(CASE_CONCEPT_NAME, "case_index", "case_number",
+                         "length", "last_timestamp"), total_cases)
+
+def iter_animation_chunks(event_log: pl.DataFrame, freq_dfg: dfg_type,
+                          dfg_activities: list[str],
+                          every: str = "monthly",
+                          cases: pl.DataFrame | None = None
+                          ) -> Iterator[AnimationChunk]:
+    """
+    Yield the steps of the animation in time windows, so the playback can
+    start with the first window while the later ones are fetched on
+    demand. The steps of each window are built when it is requested, from
+    the events of the window (a slice of the timestamp sorted event log)
+    and the row of the previous event of each case, carried between the
+    windows, so besides the event log only the cases (a few arrays) and
+    the current window are kept. A step is yielded on the window of its
+    target event (its startTime may be on a previous window) and the
+    windows without steps are skipped.
+
+    Args:
+        event_log (pl.DataFrame): The event log sorted by timestamp
+        freq_dfg (dfg_type): The Directly-Follows Graph
+        dfg_activities (list[str]): The activities in the DFG
+        every (str, optional): The size of the windows, weekly, monthly,
+            quarterly, yearly or a polars duration string (e.g. "15d").
+            Defaults to "monthly".
+        cases (pl.DataFrame | None, optional): The cases of
+            get_animation_cases, if already computed. Defaults to None.
+
+    Yields:
+        AnimationChunk: The window bounds and its steps by edge, with the
+        same ids and times of the whole animation
+    """
+    if event_log.height == 0:
+        return
+    if cases is None:
+        cases, _ = get_animation_cases(event_log, freq_dfg)
+    every = WINDOW_INTERVALS.get(every, every)
+    dfg_edges = get_dfg_edges(freq_dfg)
+    activities_ids = get_activities_ids(dfg_activities)
+    activities = event_log.get_column(ACTIVITY_NAME).cast(pl.Utf8)
+    timestamps = event_log.get_column(TIMESTAMP_NAME)
+    first_case_date = timestamps[0]
+
+    # the case of each event (from 0) and, for each case, the row of its
+    # last event and its events amount until the current window
+    case_indexes = (event_log.select(CASE_CONCEPT_NAME)
+        .join(cases.select(CASE_CONCEPT_NAME, "case_index"),
+              on=CASE_CONCEPT_NAME, how="left")
+        .get_column("case_index").to_numpy() - 1)
+    case_numbers = cases.get_column("case_number").to_numpy()
+    lengths = cases.get_column("length").to_numpy()
+    carried_rows = np.full(cases.height, -1, dtype=np.int64)
+    carried_counts = np.zeros(cases.height, dtype=np.int64)
+
+    offset = 0
+    while offset < event_log.height:
+        window_start = timestamps.slice(offset, 1).dt.truncate(every)
+        window_end = window_start.dt.offset_by(every)
+        end = timestamps.search_sorted(window_end[0], side="left")
+
+        # the events of the window grouped by case, on their order
+        order = np.argsort(case_indexes[offset:end], kind="stable")
+        rows = offset + order
+        window_cases = case_indexes[rows]
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = window_cases[1:] != window_cases[:-1]
+        last = np.ones(len(rows), dtype=bool)
+        last[:-1] = first[1:]
+        previous_rows = np.where(first, carried_rows[window_cases],
+                                 np.roll(rows, 1))
+        group_starts = np.maximum.accumulate(
+            np.where(first, np.arange(len(rows)), 0))
+        positions = (carried_counts[window_cases]
+                     + np.arange(len(rows)) - group_starts)
+        carried_rows[window_cases[last]] = rows[last]
+        carried_counts[window_cases[last]] = positions[last] + 1
+        offset = end
+
+        steps_rows = previous_rows >= 0
+        rows, previous_rows = rows[steps_rows], previous_rows[steps_rows]
+        window_cases = window_cases[steps_rows]
+        steps = (pl.DataFrame({
+                "case_index": window_cases + 1,
+                "case_number": case_numbers[window_cases],
+                "position": positions[steps_rows],
+                "length": lengths[window_cases],
+                "source": activities.gather(previous_rows),
+                "target": activities.gather(rows),
+                "last_timestamp": timestamps.gather(previous_rows),
+                "current_timestamp": timestamps.gather(rows) })
+            .lazy()
+            .filter(pl.col("source").is_in(dfg_activities)
+                    | pl.col("target").is_in(dfg_activities))
+            .join(dfg_edges.lazy(), on=["source", "target"], how="left")
+            .with_columns(pl.col("signed").fill_null(False))
+            .sort("last_timestamp", "case_index", "position")
+            .collect())
+        if steps.height == 0:
+            continue
+        steps = add_steps_keys(add_steps_times(steps, first_case_date),
+                               activities_ids)
+        yield {
+            "window_start": window_start[0],
+            "window_end": window_end[0],
+            "edges": get_steps_edges(steps),
+        }
+
+def get_animation_stream(dataframe: pl.DataFrame, freq_dfg: dfg_type,
+                         perf_dfg: dfg_type, activity_count: dict[str, int],
+                         every: str = "monthly"
+                         ) -> tuple[AnimationData, Iterator[AnimationChunk]]:
+    """
+    Streaming version of animation_data_handler: the header of the
+    animation (without the steps) and the generator of the steps by time
+    window (see iter_animation_chunks). Only the cases of the event log
+    are computed for the header, the steps are built by the generator.
+
+    Args:
+        dataframe (pl.DataFrame): The event log
+        freq_dfg (dfg_type): The Directly-Follows Graph
+        perf_dfg (dfg_type): The Performance Directly-Follows Graph
+        activity_count (dict[str, int]): The activities frequency
+        every (str, optional): The size of the windows. Defaults to
+            "monthly".
+
+    Returns:
+        tuple[AnimationData, Iterator[AnimationChunk]]: The animation data
+        with empty edges and the chunks of the steps
+    """
+    median_durations = get_median_durations(freq_dfg, perf_dfg)
+    ordered_eventlog, dfg_activities = prepare_animation_log(dataframe,
+                                                             freq_dfg)
+    cases, total_cases = get_animation_cases(ordered_eventlog, freq_dfg)
+
+    first_case_date, last_case_date, total_duration = None, None, 0
+    if ordered_eventlog.height > 0:
+        first_case_date = ordered_eventlog.get_column(TIMESTAMP_NAME).min()
+        last_case_date = cases.get_column("last_timestamp")[-1]
+        total_duration = time_elapsed(first_case_date, last_case_date)
+    header: AnimationData = {
+        "edges": { "unsigned": [] },
+        "nodes": get_nodes_frequency(activity_count),
+        "end_time": last_case_date,
+        "total_cases": total_cases,
+        "medians": median_durations,
+        "start_time": first_case_date,
+        "total_duration": total_duration,
+    }
+    return header, iter_animation_chunks(ordered_eventlog, freq_dfg,
+                                         dfg_activities, every, cases)
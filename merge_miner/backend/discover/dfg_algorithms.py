@@ -1,4 +1,10 @@
-from ..constants import ACTIVITY_ID_NAME
+from ..polars.performance import (get_successive_rows, get_statistic_expr,
+                                  Parameters as PerformanceParams)
+from ..constants import ACTIVITY_ID_NAME, USER_KEY
+from pm4py.util import exec_utils
+from pm4py.util import xes_constants as xes_util
+from typing import Any, Iterable
+from ..types import dfg_type
 import polars as pl
 
 def employee_frequency(dataframe: pl.DataFrame, employee: str | int,
@@ -28,3 +34,88 @@ def employee_frequency(dataframe: pl.DataFrame, employee: str | int,
                              .get_column(activity_key).value_counts()
                              .rows_by_key(activity_key)).items()
     return { key:value[0] for key, value in frequency_df }
+
+def employees_dfg_tables(dataframe: pl.DataFrame | pl.LazyFrame,
+                         statistics: Iterable[str] = ("median", "count"),
+                         group_keys: Iterable[str] = (USER_KEY,),
+                         parameters: dict[str | PerformanceParams, Any]
+                            | None = None
+                         ) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Get the performance of the edges and the frequency of the activities
+    of every employee at once (the batch version of apply_dfg_performance
+    with the employee filter and employee_frequency), where the edges
+    belong to the employee of the source event.
+
+    Parameters
+    ------------
+    dataframe (polars.DataFrame)
+        The dataframe
+    statistics (Iterable[str], optional)
+        The performance statistics of the edges (see get_statistic_expr).
+        Defaults to median and count.
+    group_keys (Iterable[str], optional)
+        The columns that group the events, e.g. [TYPE_KEY] for each type
+        of employee or [TYPE_KEY, USER_KEY]. Defaults to [USER_KEY].
+    parameters (dict, optional)
+        The parameters of apply_dfg_performance (the filter is ignored)
+
+    Returns
+    ------------
+    tuple[pl.DataFrame, pl.DataFrame]: The edges table (the group keys,
+    source, target and the statistics in seconds) and the activities table
+    (the group keys, activity and frequency), sorted by the group keys
+    """
+    if parameters is None: parameters = {}
+    group_keys = list(group_keys)
+    activity_key = exec_utils.get_param_value(
+        PerformanceParams.ACTIVITY_KEY, parameters,
+        xes_util.DEFAULT_NAME_KEY)
+
+    edges_plan = (get_successive_rows(dataframe, parameters, True,
+                                      apply_filter=False, keys=group_keys)
+        .group_by(*group_keys, activity_key, "next_activity")
+        .agg([get_statistic_expr(statistic) for statistic in statistics])
+        .rename({ activity_key: "source", "next_activity": "target" })
+        .sort(*group_keys, "source", "target"))
+    activities_plan = (dataframe.lazy()
+        .group_by(*group_keys, activity_key)
+        .agg(pl.len().alias("frequency"))
+        .rename({ activity_key: "activity" })
+        .sort(*group_keys, "activity"))
+
+    edges, activities = pl.collect_all([edges_plan, activities_plan])
+    return edges, activities
+
+def get_group_dfgs(edges: pl.DataFrame, activities: pl.DataFrame,
+                   group: dict[str, Any], statistic: str = "median"
+                   ) -> tuple[dfg_type, dict[str, int]]:
+    """
+    Slice the tables of employees_dfg_tables to the performance dfg and
+    the activities frequency of a single group.
+
+    Parameters
+    ------------
+    edges (pl.DataFrame)
+        The edges table
+    activities (pl.DataFrame)
+        The activities table
+    group (dict[str, Any])
+        The value of each group key, e.g. { USER_KEY: employee }
+    statistic (str, optional)
+        The statistic of the performance dfg. Defaults to "median".
+
+    Returns
+    ------------
+    tuple[dfg_type, dict[str, int]]: The performance dfg and the
+    frequency of each activity of the group
+    """
+    condition = pl.all_horizontal([pl.col(key) == value
+                                   for key, value in group.items()])
+    group_edges = edges.filter(condition)
+    group_activities = activities.filter(condition)
+    return ({ (source, target): value for source, target, value in
+              group_edges.select("source", "target", statistic)
+                         .iter_rows() },
+            dict(group_activities.select("activity", "frequency")
+                                 .iter_rows()))
@@ -1,6 +1,10 @@
-from ..heuristics import (partition_dataframe_into_dfgs,
-                         update_cluster, merge_partitioned_dfgs)
+from ..research_essentials.islands import (get_edges_to_merge_dfg_islands,
+                                           filter_by_larger_island)
+from ..polars.performance import (get_dfg_frequency_and_performance,
+                                  Parameters as PerformanceParams)
+from ..heuristics import merge_partitioned_dfgs
 from ..constants import ACTIVITY_NAME
+from ..sparse_dfg import SparseDFG
 from collections import Counter
 from ..types import dfg_type
 import polars as pl
@@ -14,53 +18,35 @@ def frequency_dfg(eventlog: pl.DataFrame, max_no_of_events: int = 100,
     Sort the edges_list by frequency and trim the edges of the edges_list
     based on the percentage, from 0% to 50%, eg:
     percentage = 0.1 so will divide the list in three (10% and 80% and 10%).
+    """
+    (start_dfg, middle_dfg, end_dfg), _ = get_dfg_frequency_and_performance(
+        eventlog, percentage, [], parameters={
+            PerformanceParams.ACTIVITY_KEY: ACTIVITY_NAME,
+        })
+    return filter_frequency_dfg(start_dfg, middle_dfg, end_dfg,
+                                max_no_of_events, keep_events, percentage)
+
+def filter_frequency_dfg(start_dfg: dfg_type, middle_dfg: dfg_type,
+                         end_dfg: dfg_type, max_no_of_events: int = 100,
+                         keep_events: list = [], percentage: float = 0.1
+                         ) -> dict[tuple[str, str], int]:
+    """
+    Filter the start, middle and end frequencies of the edges (e.g. from
+    get_dfg_frequency_and_performance) as frequency_dfg.
 
     Warning: It's used the concept of pointers to manipulate the lists
     """
     def merge_clusters(result_edges: dfg_type, all_edges: dfg_type) -> dfg_type:
-        nonlocal edges_clusters
-
-        for edge, value in all_edges.items():
-            first, second = edge
-            
-            first_cluster = -1
-            second_cluster = -1
-            for index, cluster in enumerate(edges_clusters):
-                if first in cluster:
-                    first_cluster = index
-                if second in cluster:
-                    second_cluster = index
-                if first_cluster != -1 and second_cluster != -1:
-                    break
-            
-            if first_cluster == second_cluster: continue
-
-            if first_cluster != -1 and second_cluster != -1:
-                edges_clusters[first_cluster] = (
-                    edges_clusters[first_cluster].union(
-                        edges_clusters[second_cluster]))
-                edges_clusters.pop(second_cluster)
-                result_edges[edge] = value
-
-            if len(edges_clusters) == 1:
-                break
-
-        if len(edges_clusters) > 1:
-            edges_clusters = sorted(edges_clusters, key=lambda x: len(x),
-                                    reverse=True)
-            for cluster in edges_clusters[1:]:
-                for activity in cluster:
-                    keys_list = result_edges.keys()
-                    for edge in list(keys_list):
-                        if activity in edge:
-                            del result_edges[edge]
-        return result_edges
+        edges_to_merge = get_edges_to_merge_dfg_islands(result_sparse_dfg,
+                                                        all_edges)
+        result_edges.update(edges_to_merge)
+        return filter_by_larger_island(result_edges,
+                                       added_edges + list(edges_to_merge))
 
     def add_new_edge(result_edges: list, new_edge: tuple):
         unique_nodes.update(new_edge[0])
         unique_edges.add(new_edge[0])
         result_edges.append(new_edge)
-        update_cluster(edges_clusters, new_edge[0])
 
     def add_edge_by_count(result_edges: list, edges_list: list,
                           initial_count: int, count_limit: int):
@@ -98,12 +84,9 @@ def frequency_dfg(eventlog: pl.DataFrame, max_no_of_events: int = 100,
                           initial_count, count)
         return result_edges
 
-    start_dfgs, middle_dfgs, end_dfgs = partition_dataframe_into_dfgs(
-        eventlog, ACTIVITY_NAME, percentage)
-
-    middle_edges = list(Counter(middle_dfgs).items())
-    start_edges = list(Counter(start_dfgs).items())
-    end_edges = list(Counter(end_dfgs).items())
+    middle_edges = list(middle_dfg.items())
+    start_edges = list(start_dfg.items())
+    end_edges = list(end_dfg.items())
     all_edges = Counter()
     all_edges.update(middle_edges)
     all_edges.update(start_edges)
@@ -111,7 +94,6 @@ def frequency_dfg(eventlog: pl.DataFrame, max_no_of_events: int = 100,
 
     unique_edges = set()
     unique_nodes = set()
-    edges_clusters = list()
 
     sides_count = round(max_no_of_events * percentage)
     middle_count = max_no_of_events - sides_count * 2
@@ -119,11 +101,15 @@ def frequency_dfg(eventlog: pl.DataFrame, max_no_of_events: int = 100,
     start_edges = filter_by_count(start_edges, sides_count)
     end_edges = filter_by_count(end_edges, sides_count)
     result_edges = filter_by_count(middle_edges, middle_count)
+    # the order the edges were added, which orders the islands in ties
+    added_edges = [edge for edge, _ in start_edges + end_edges + result_edges]
 
     result_edges = merge_partitioned_dfgs(dict(start_edges),
                         dict(result_edges), dict(end_edges))
 
-    if len(edges_clusters) > 1:
+    result_sparse_dfg = SparseDFG.from_dfg(
+        dict(start_edges + end_edges + list(result_edges.items())))
+    if result_sparse_dfg.component_labels()[0] > 1:
         result_edges = merge_clusters(result_edges, all_edges)
 
     return result_edges
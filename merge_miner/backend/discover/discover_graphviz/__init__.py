@@ -1,4 +1,9 @@
-from .compare_gviz import compare_visualization
-from .graphviz_utils import (Digraph, get_treated_graphviz, add_start_end_nodes)
+from .compare_gviz import compare_visualization, get_units_comparison
+from .graphviz_utils import (Digraph, get_treated_graphviz, add_start_end_nodes,
+                             render_to_bytes)
 from .discover_utils import (break_lines, get_activities_from_dfg, get_activities_color_soj_time)
+from .node_ids import get_activity_hash, get_node_id, get_edge_id
+from .render_cache import RenderCache, render_cache
+from .render_pool import RenderPool, RenderTimeout, render_pool
+from .layout_cache import LayoutCache, layout_cache
 from .constants import *
\ No newline at end of file
@@ -3,8 +3,10 @@ from .discover_utils import (get_activities_from_dfg,  break_lines,
 from .graphviz_utils import (Digraph, classify_activities_by_included_or_not,
                              get_treated_graphviz, create_not_exist_node,
                              add_start_end_nodes)
+from .node_ids import get_node_id, get_edge_id
 from .constants import (TOP_ACTIVITIES, BOTTOM_ACTIVITIES,
                         DF_COLOR_ACT, GREEN_COLORS)
+from ..types import UnitsComparison, ComparisonParticipation
 from ...types import dfg_type
 
 
@@ -34,7 +36,7 @@ def create_nodes(graph: Digraph, activity_list: list[str],
         label = f" {break_lines(act)} "
         font_color, bg_color = activity_colors.get(act, DF_COLOR_ACT)
 
-        node_id = "n" + str(hash(act))
+        node_id = get_node_id(act)
         graph.node(node_id, label, id=node_id, tooltip=act,
                    fontcolor=font_color, fillcolor=bg_color,
                    style="filled,rounded", margin="0.1")
@@ -54,12 +56,50 @@ def create_edges(viz: Digraph, edges_infos: dfg_type):
     """
     for edge in edges_infos.keys():
         tooltip = f"{edge[0]} -> {edge[1]}"
-        act1 = "n" + str(hash(edge[0]))
-        act2 = "n" + str(hash(edge[1]))
+        act1 = get_node_id(edge[0])
+        act2 = get_node_id(edge[1])
         edge_id = act1 + act2
         viz.edge(act1, act2, id=edge_id, tooltip=tooltip,
                  labeltooltip=tooltip)
 
+def get_units_comparison(participation: ComparisonParticipation,
+                         unit_a: int, unit_b: int,
+                         only_passes: bool = True) -> list[UnitsComparison]:
+    """
+    Get which of the two units use each edge of the comparison graph,
+    where the id is the same id of the edge created by create_edges.
+
+    Parameters
+    ----------------
+    participation
+        Participation table returned with the comparison graph
+    unit_a
+        Index of the first unit
+    unit_b
+        Index of the second unit
+    only_passes
+        If only the frequencies that pass the threshold of the edge are
+        considered as using the edge
+
+    Returns
+    ----------------
+    units_comparison
+        List with the units that use each edge of the comparison graph
+    """
+    edges_units: dict[tuple[str, str], set[int]] = dict()
+    for source, target, unit, passes in zip(
+        participation["source"], participation["target"],
+        participation["unit"], participation["passes"]):
+        units = edges_units.setdefault((source, target), set())
+        if passes or not only_passes:
+            units.add(unit)
+
+    return [{
+        "id": get_edge_id(source, target),
+        "unidade_a": unit_a if unit_a in units else None,
+        "unidade_b": unit_b if unit_b in units else None,
+    } for (source, target), units in edges_units.items()]
+
 def compare_visualization(comparison_dfg: dfg_type,
                           activity_count: dict[str, int],
                           start_activities: list[str],
@@ -1,7 +1,10 @@
 from .constants import GRAY_COLOR, DARK_GRAY_COLOR, START_ID, END_ID
 from .discover_utils import break_lines
-from tempfile import NamedTemporaryFile
+from .node_ids import get_node_id
+from .render_cache import render_cache
+from .render_pool import render_pool
 from graphviz import Digraph
+import gzip
 
 def get_treated_graphviz(bg_color: str="transparent", font_size: str="11",
                          image_format: str="svg", is_horizontal: bool=False,
@@ -35,9 +38,7 @@ def get_treated_graphviz(bg_color: str="transparent", font_size: str="11",
     """
     viz = Digraph(format=image_format)
     if not is_subgraph:
-        filename = NamedTemporaryFile(suffix='.gv')
-        viz = Digraph("", filename=filename.name, engine='dot',
-                      graph_attr = { 'bgcolor': bg_color },
+        viz = Digraph("", engine='dot', graph_attr = { 'bgcolor': bg_color },
                       format=image_format)
 
     direction = "LR" if is_horizontal else "TB"
@@ -51,6 +52,35 @@ def get_treated_graphviz(bg_color: str="transparent", font_size: str="11",
 
     return viz
 
+def render_to_bytes(viz: Digraph, compress: bool = False) -> bytes:
+    """
+    Render the graph in memory, piping the DOT source to graphviz over
+    stdin and reading the output from stdout, without files on disk. The
+    render runs on the render pool (with its time budget and fallbacks)
+    and is kept on the hot tier of the render cache.
+
+    Parameters
+    ----------------
+    viz
+        Graphviz Digraph object
+    compress
+        If the output is compressed with gzip (e.g. to be sent with
+        Content-Encoding: gzip)
+    
+    Returns
+    ----------------
+    data
+        The rendered graph, in the format of the Digraph
+    """
+    key = render_cache.get_viz_key(viz)
+    data = render_cache.get_hot(key)
+    if data is None:
+        data = render_pool.submit(viz, cached=False).result()
+        render_cache.put_hot(key, data)
+    if compress:
+        data = gzip.compress(data)
+    return data
+
 def classify_activities_by_included_or_not(
     activity_list: list[str], activities_to_check: list[str]
 ) -> tuple[list[str], list[str]]:
@@ -160,7 +190,7 @@ def create_not_exist_node(graph: Digraph, activities_to_include: list[str],
     for act in activities_to_include:
         act_label = f" {break_lines(act)} \n"
         label = f"{act_label} não executou"
-        node_id = "n" + str(hash(act))
+        node_id = get_node_id(act)
         graph.node(node_id, label, id=node_id, style="rounded,dashed",
                    fontcolor=GRAY_COLOR, color=GRAY_COLOR)
         activities_map[act] = node_id
@@ -0,0 +1,231 @@
+from concurrent.futures import Future
+from collections import OrderedDict
+from .render_pool import RenderPool, render_pool
+from graphviz import Digraph
+from typing import Hashable
+import json, logging, re, threading
+
+# quoted, numeral or name (with the non-ascii letters) ids of DOT
+NODE_ID_PATTERN = (r'"(?:[^"\\]|\\.)*"|-?(?:\d+\.?\d*|\.\d+)'
+                   r'|[A-Za-z_\u0080-\uffff][\w\u0080-\uffff]*')
+NODE_STATEMENT = re.compile(rf"^({NODE_ID_PATTERN})(?:\s*\[.*\])?$",
+                            re.DOTALL)
+EDGE_STATEMENT = re.compile(
+    rf"^({NODE_ID_PATTERN})\s*->\s*({NODE_ID_PATTERN})(?:\s*\[.*\])?$",
+    re.DOTALL)
+DOT_KEYWORDS = { "node", "edge", "graph", "subgraph", "digraph", "strict" }
+
+def unquote_id(node_id: str) -> str:
+    if node_id.startswith('"'):
+        return node_id[1:-1].replace('\\"', '"')
+    return node_id
+
+def get_graph_nodes(viz: Digraph) -> set[str]:
+    """
+    Get the ids of the nodes of the graph (including its subgraphs), from
+    the node and edge statements of its body.
+
+    Parameters
+    ----------------
+    viz
+        Graphviz Digraph object
+
+    Returns
+    ----------------
+    nodes
+        The ids of the nodes, unquoted
+    """
+    nodes: set[str] = set()
+    for statement in viz.body:
+        statement = statement.strip()
+        edge = EDGE_STATEMENT.match(statement)
+        if edge is not None:
+            nodes.update(unquote_id(node_id) for node_id in edge.groups())
+            continue
+        node = NODE_STATEMENT.match(statement)
+        if node is not None and node.group(1) not in DOT_KEYWORDS:
+            nodes.add(unquote_id(node.group(1)))
+    return nodes
+
+def get_layout_positions(layout: bytes | str
+                         ) -> dict[str, tuple[float, float]]:
+    """
+    Get the positions (in points) of the nodes of a graphviz -Tjson
+    output.
+
+    Parameters
+    ----------------
+    layout
+        The json output of graphviz
+
+    Returns
+    ----------------
+    positions
+        Dict associating to each node id its position
+    """
+    positions: dict[str, tuple[float, float]] = dict()
+    for obj in json.loads(layout).get("objects", []):
+        # the subgraphs are objects with the list of their nodes
+        if "pos" not in obj or "nodes" in obj:
+            continue
+        x, y = obj["pos"].split(",")[:2]
+        positions[obj["name"]] = (float(x), float(y))
+    return positions
+
+class LayoutCache:
+    """
+    Cache of the positions of the nodes of the graphs of a view (e.g. the
+    DFG of a unit while the user moves the max_edges slider), so the
+    re-renders reuse the layout instead of running dot again. The first
+    render of a view is the graph itself (rendered by dot, as without the
+    cache), while the positions of its dot layout (-Tjson) are computed
+    on the render pool for the next renders, which only place the new
+    nodes with a neato pass where the known nodes are pinned. The graph
+    returned is rendered by neato with all the nodes pinned, which only
+    routes the edges, so the nodes keep their places between the renders.
+    The layout passes run on the pool, with its time budget and
+    fallbacks, and when they fail the graph is rendered without the
+    layout. The layouts are shared by the threads of the server, so they
+    are only accessed with the lock (the graphviz passes run outside of
+    it).
+    """
+    def __init__(self, max_layouts: int = 32, layout_engine: str = "dot",
+                 pinned_engine: str = "neato",
+                 pool: RenderPool | None = None):
+        """
+        Parameters
+        ----------------
+        max_layouts
+            Maximum views kept (least recently used eviction). Default: 32
+        layout_engine
+            Engine of the full layout. Default: dot
+        pinned_engine
+            Engine of the passes with pinned nodes (neato or fdp).
+            Default: neato
+        pool
+            The pool where the layout passes run. Default: None (they run
+            with Digraph.pipe)
+        """
+        self.max_layouts = max_layouts
+        self.layout_engine = layout_engine
+        self.pinned_engine = pinned_engine
+        self.pool = pool
+        # the positions of each view, or the future of its first layout
+        self.layouts: OrderedDict[Hashable,
+            dict[str, tuple[float, float]] | Future]
+        self.layouts = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.layouts)
+
+    def forget(self, layout_key: Hashable) -> None:
+        with self.lock:
+            self.layouts.pop(layout_key, None)
+
+    def submit_layout(self, viz: Digraph, engine: str) -> Future:
+        """Submit the -Tjson pass of the graph with the engine."""
+        layout = viz.copy()
+        layout.format, layout.engine = "json", engine
+        if self.pool is not None:
+            return self.pool.submit(layout, cached=False)
+        future = Future()
+        try:
+            future.set_result(layout.pipe())
+        except Exception as error:
+            future.set_exception(error)
+        return future
+
+    @staticmethod
+    def get_future_positions(layout: Future
+                             ) -> dict[str, tuple[float, float]] | None:
+        """The positions of the layout pass, or None if it failed."""
+        try:
+            return get_layout_positions(layout.result())
+        except Exception as error:
+            logging.warning(f"{__name__}: layout pass failed ({error!r}),"
+                            " rendering without the layout.")
+            return None
+
+    def store(self, layout_key: Hashable,
+              positions: dict[str, tuple[float, float]] | Future) -> None:
+        with self.lock:
+            # the positions placed by another thread in the meantime are
+            # kept, the ones of this graph win
+            stored = self.layouts.get(layout_key)
+            if isinstance(stored, dict) and isinstance(positions, dict):
+                positions = { **stored, **positions }
+            self.layouts[layout_key] = positions
+            self.layouts.move_to_end(layout_key)
+            while len(self.layouts) > self.max_layouts:
+                self.layouts.popitem(last=False)
+
+    def get_pinned_graph(self, viz: Digraph,
+                         positions: dict[str, tuple[float, float]],
+                         nodes: set[str]) -> Digraph:
+        """
+        Copy of the graph rendered by the pinned engine, where the nodes
+        with position are pinned (the positions are in points).
+        """
+        pinned = viz.copy()
+        pinned.engine = self.pinned_engine
+        pinned.attr(inputscale="72", notranslate="true", splines="true")
+        for node_id in sorted(nodes):
+            if node_id in positions:
+                x, y = positions[node_id]
+                pinned.node(node_id, pos=f"{x:.2f},{y:.2f}!", pin="true")
+        return pinned
+
+    def get_layout(self, viz: Digraph, layout_key: Hashable) -> Digraph:
+        """
+        Get the graph with all the nodes pinned on the positions of the
+        view, placing the nodes that weren't seen on the view.
+
+        Parameters
+        ----------------
+        viz
+            Graphviz Digraph object
+        layout_key
+            The key of the view
+
+        Returns
+        ----------------
+        pinned
+            The graph to be rendered (by pipe, render or the render cache
+            and pool), with the pinned engine, or the graph itself on the
+            first render of the view and when the layout passes fail
+        """
+        nodes = get_graph_nodes(viz)
+        with self.lock:
+            positions = self.layouts.get(layout_key)
+        if isinstance(positions, Future):
+            positions = self.get_future_positions(positions)
+            if positions is None:
+                self.forget(layout_key)
+                return viz
+            self.store(layout_key, positions)
+        positions = positions or dict()
+
+        missing = nodes - positions.keys()
+        if missing == nodes:
+            self.store(layout_key,
+                       self.submit_layout(viz, self.layout_engine))
+            return viz
+        if missing:
+            partial = self.get_pinned_graph(viz, positions, nodes)
+            partial.attr(overlap="false")
+            placed = self.get_future_positions(
+                self.submit_layout(partial, self.pinned_engine))
+            if placed is None:
+                return viz
+            # only the new nodes, in case a fallback moved the pinned ones
+            positions = { **positions, **{ node_id: placed[node_id]
+                          for node_id in missing if node_id in placed } }
+        self.store(layout_key, positions)
+
+        pinned = self.get_pinned_graph(viz, positions, nodes)
+        # the nodes are already placed without overlaps
+        pinned.attr(overlap="true")
+        return pinned
+
+layout_cache = LayoutCache(pool=render_pool)
@@ -0,0 +1,39 @@
+from functools import lru_cache
+from hashlib import blake2b
+
+# 8 bytes (16 hex digits) keep the ids short and the collisions unlikely
+# even with thousands of activities
+ID_DIGEST_SIZE = 8
+
+@lru_cache(maxsize=None)
+def get_activity_hash(activity: str) -> str:
+    """
+    Get the stable hash of the activity, the same on every process (unlike
+    the builtin hash, salted by PYTHONHASHSEED), so the rendered graphs and
+    the animation payloads can be cached and shared between workers.
+
+    Parameters
+    ----------------
+    activity
+        Name of the activity
+
+    Returns
+    ----------------
+    activity_hash
+        Hexadecimal digest of the activity name
+    """
+    return blake2b(activity.encode("utf-8"),
+                   digest_size=ID_DIGEST_SIZE).hexdigest()
+
+def get_node_id(activity: str) -> str:
+    """
+    Get the id of the node of the activity on the graphs and animations.
+    """
+    return "n" + get_activity_hash(activity)
+
+def get_edge_id(source: str, target: str) -> str:
+    """
+    Get the id of the edge between two activities, the concatenation of
+    the ids of the nodes.
+    """
+    return get_node_id(source) + get_node_id(target)
@@ -0,0 +1,205 @@
+from collections import OrderedDict
+from hashlib import blake2b
+from graphviz import Digraph
+import os, tempfile, threading
+
+DEFAULT_RENDER_DIRECTORY = os.path.join(tempfile.gettempdir(),
+                                        "merge_miner_renders")
+# subdirectory of the store where the renders are written before being
+# renamed, so the files being written aren't evicted nor counted
+STAGING_DIRECTORY = ".staging"
+
+class RenderCache:
+    """
+    Content-addressed cache of the rendered graphs, keyed by the hash of
+    the DOT source, the format and the engine, so an identical view is
+    served without running graphviz. The renders are stored on a disk
+    directory (shared by the processes) with a size-bounded LRU eviction,
+    by the modification time, and the most recent ones are also kept in
+    memory (the hot tier).
+    """
+    def __init__(self, directory: str = DEFAULT_RENDER_DIRECTORY,
+                 max_bytes: int = 256 * 1024 * 1024, hot_entries: int = 64):
+        """
+        Parameters
+        ----------------
+        directory
+            Directory of the disk store
+        max_bytes
+            Maximum size of the disk store, in bytes. Default: 256 MB
+        hot_entries
+            Maximum renders kept in memory. Default: 64
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hot_entries = hot_entries
+        self.hot: OrderedDict[str, bytes] = OrderedDict()
+        self.lock = threading.Lock()
+        self.disk_bytes: int | None = None
+
+    @staticmethod
+    def get_key(source: str, image_format: str, engine: str,
+                renderer: str | None = None,
+                formatter: str | None = None) -> str:
+        """
+        Get the key of a render, the hash of everything that changes the
+        output of graphviz.
+        """
+        digest = blake2b(digest_size=16)
+        for part in (image_format, engine, renderer, formatter):
+            digest.update(f"{part or ''}\0".encode("utf-8"))
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def get_viz_key(viz: Digraph) -> str:
+        return RenderCache.get_key(viz.source, viz.format, viz.engine,
+                                   viz.renderer, viz.formatter)
+
+    def get_path(self, key: str, image_format: str) -> str:
+        return os.path.join(self.directory, f"{key}.{image_format}")
+
+    def get(self, key: str, image_format: str) -> bytes | None:
+        """
+        Get the render from the hot tier or the disk store (promoted to
+        the hot tier), or None if it is not cached.
+        """
+        data = self.get_hot(key)
+        if data is not None:
+            return data
+
+        path = self.get_path(key, image_format)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        self.put_hot(key, data)
+        return data
+
+    def get_hot(self, key: str) -> bytes | None:
+        """Get the render only from the hot tier, without the disk."""
+        with self.lock:
+            if key not in self.hot:
+                return None
+            self.hot.move_to_end(key)
+            return self.hot[key]
+
+    def put_hot(self, key: str, data: bytes) -> None:
+        with self.lock:
+            self.hot[key] = data
+            self.hot.move_to_end(key)
+            while len(self.hot) > self.hot_entries:
+                self.hot.popitem(last=False)
+
+    def put(self, key: str, image_format: str, data: bytes) -> str:
+        """
+        Store the render on both tiers, evicting the least recently used
+        files when the disk store exceeds its size.
+
+        Returns
+        ----------------
+        path
+            Path of the file of the render
+        """
+        self.put_hot(key, data)
+        staging = os.path.join(self.directory, STAGING_DIRECTORY)
+        os.makedirs(staging, exist_ok=True)
+        path = self.get_path(key, image_format)
+        # written to a temporary file and then renamed, so the other
+        # processes never read a partial render
+        fd, temporary_path = tempfile.mkstemp(dir=staging, suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(temporary_path, path)
+
+        with self.lock:
+            if self.disk_bytes is None:
+                self.disk_bytes = sum(entry.stat().st_size
+                    for entry in os.scandir(self.directory)
+                    if entry.is_file())
+            else:
+                self.disk_bytes += len(data)
+            if self.disk_bytes > self.max_bytes:
+                self.evict(keep=path)
+        return path
+
+    def evict(self, keep: str | None = None) -> None:
+        """Remove the oldest files until the store fits on max_bytes."""
+        entries = list()
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                continue
+
+        self.disk_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if self.disk_bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.disk_bytes -= size
+
+    def clear(self) -> None:
+        with self.lock:
+            self.hot.clear()
+            self.disk_bytes = None
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.is_file():
+                    os.remove(entry.path)
+
+    def render_bytes(self, viz: Digraph) -> bytes:
+        """
+        Render the graph (with Digraph.pipe) or get it from the cache.
+
+        Parameters
+        ----------------
+        viz
+            Graphviz Digraph object
+
+        Returns
+        ----------------
+        data
+            The rendered graph
+        """
+        key = self.get_viz_key(viz)
+        data = self.get(key, viz.format)
+        if data is None:
+            data = viz.pipe()
+            self.put(key, viz.format, data)
+        return data
+
+    def render(self, viz: Digraph) -> str:
+        """
+        Render the graph to a file of the disk store, as Digraph.render,
+        running graphviz only when the render isn't cached.
+
+        Parameters
+        ----------------
+        viz
+            Graphviz Digraph object
+
+        Returns
+        ----------------
+        path
+            Path of the rendered file
+        """
+        key = self.get_viz_key(viz)
+        path = self.get_path(key, viz.format)
+        data = self.get(key, viz.format)
+        if data is None:
+            data = viz.pipe()
+        elif os.path.exists(path):
+            return path
+        return self.put(key, viz.format, data)
+
+render_cache = RenderCache()
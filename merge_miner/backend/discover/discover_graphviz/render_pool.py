@@ -0,0 +1,231 @@
+from concurrent.futures import Future, ThreadPoolExecutor, CancelledError
+from .render_cache import RenderCache, render_cache
+from typing import Iterable
+from graphviz import Digraph
+import graphviz, logging, subprocess, threading, time
+
+# cheaper dot layout: straight edges and fewer network simplex and
+# crossing minimization iterations
+SIMPLIFIED_GRAPH_ATTRS = {
+    "splines": "line", "nslimit": "2", "nslimit1": "2",
+    "mclimit": "0.2", "searchsize": "10",
+}
+DEFAULT_FALLBACKS = (("dot", SIMPLIFIED_GRAPH_ATTRS), ("sfdp", {}))
+
+class RenderTimeout(TimeoutError):
+    """All the attempts of a render exceeded their time budget."""
+
+class RenderTask:
+    """State of a submitted render, to cancel its running process."""
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self.process: subprocess.Popen | None = None
+        self.lock = threading.Lock()
+
+    def cancel(self) -> None:
+        with self.lock:
+            self.cancelled.set()
+            if self.process is not None and self.process.poll() is None:
+                self.process.kill()
+
+class RenderPool:
+    """
+    Bounded pool of graphviz processes that renders several graphs
+    concurrently (e.g. the frequency, performance and comparison graphs of
+    a request or the graphs of a parameter study). Each render has a time
+    budget: when the engine exceeds it the process is killed and the graph
+    is rendered again with the fallbacks (a simplified dot layout and then
+    sfdp), each one with the fallback budget.
+    """
+    def __init__(self, max_workers: int = 4, timeout: float = 30,
+                 fallback_timeout: float = 30,
+                 fallbacks: Iterable[tuple[str, dict[str, str]]]
+                    = DEFAULT_FALLBACKS,
+                 cache: RenderCache | None = None):
+        """
+        Parameters
+        ----------------
+        max_workers
+            Maximum graphviz processes running at the same time. Default: 4
+        timeout
+            Time budget of the render with the engine of the graph, in
+            seconds. Default: 30
+        fallback_timeout
+            Time budget of each fallback, in seconds. Default: 30
+        fallbacks
+            The engines and the graph attributes of the fallbacks, in order.
+            Default: simplified dot and sfdp
+        cache
+            If specified, the renders are read from and stored on the cache
+            (only the renders without fallback are stored). Default: None
+        """
+        self.timeout = timeout
+        self.fallback_timeout = fallback_timeout
+        self.fallbacks = list(fallbacks)
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="render")
+        self.tasks: dict[Future, RenderTask] = dict()
+        self.lock = threading.Lock()
+
+    def __enter__(self) -> "RenderPool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown(cancel=True)
+
+    def run_engine(self, task: RenderTask, viz: Digraph, engine: str,
+                   graph_attrs: dict[str, str], timeout: float) -> bytes:
+        """
+        Run the engine on the DOT source of the graph, killing it when it
+        exceeds the timeout or the task is cancelled.
+        """
+        output_format = ":".join(part for part in
+            (viz.format, viz.renderer, viz.formatter) if part)
+        command = [engine, f"-T{output_format}"]
+        command += [f"-G{key}={value}" for key, value in graph_attrs.items()]
+        with task.lock:
+            if task.cancelled.is_set():
+                raise CancelledError()
+            try:
+                task.process = subprocess.Popen(command,
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE)
+            except FileNotFoundError as error:
+                raise graphviz.ExecutableNotFound(command) from error
+
+        try:
+            stdout, stderr = task.process.communicate(
+                viz.source.encode("utf-8"), timeout=timeout)
+        except subprocess.TimeoutExpired:
+            task.process.kill()
+            task.process.communicate()
+            raise
+        if task.cancelled.is_set():
+            raise CancelledError()
+        if task.process.returncode != 0:
+            raise graphviz.CalledProcessError(task.process.returncode,
+                command, output=stdout, stderr=stderr)
+        return stdout
+
+    def render_task(self, task: RenderTask, viz: Digraph,
+                    cached: bool = True) -> bytes:
+        key = None
+        if self.cache is not None and cached:
+            key = self.cache.get_viz_key(viz)
+            data = self.cache.get(key, viz.format)
+            if data is not None:
+                return data
+
+        attempts = [(viz.engine, {}, self.timeout)]
+        attempts += [(engine, attrs, self.fallback_timeout)
+                     for engine, attrs in self.fallbacks]
+        for i, (engine, graph_attrs, timeout) in enumerate(attempts):
+            start = time.perf_counter()
+            try:
+                data = self.run_engine(task, viz, engine, graph_attrs,
+                                       timeout)
+            except subprocess.TimeoutExpired:
+                logging.warning(f"{__name__}: {engine} exceeded {timeout}s"
+                                f" (attempt {i + 1} of {len(attempts)}).")
+                continue
+            if i == 0 and key is not None:
+                self.cache.put(key, viz.format, data)
+            elif i > 0:
+                logging.warning(f"{__name__}: rendered with the fallback "
+                    f"{engine} in {time.perf_counter() - start:.2f}s.")
+            return data
+        raise RenderTimeout(f"All the {len(attempts)} render attempts "
+                            "exceeded their time budget.")
+
+    def submit(self, viz: Digraph, cached: bool = True) -> Future:
+        """
+        Submit the render of the graph.
+
+        Parameters
+        ----------------
+        viz
+            Graphviz Digraph object
+        cached
+            If the render is read from and stored on the cache of the pool
+            (if any). Default: True
+
+        Returns
+        ----------------
+        future
+            Future of the rendered bytes, which raises RenderTimeout when
+            all the attempts time out
+        """
+        task = RenderTask()
+        future = self.executor.submit(self.render_task, task, viz, cached)
+        with self.lock:
+            self.tasks[future] = task
+        future.add_done_callback(self.remove_task)
+        return future
+
+    def remove_task(self, future: Future) -> None:
+        with self.lock:
+            self.tasks.pop(future, None)
+
+    def cancel(self, future: Future) -> bool:
+        """
+        Cancel the render: a pending render is never started and a running
+        one has its process killed (and its future raises CancelledError).
+        """
+        with self.lock:
+            task = self.tasks.get(future)
+        if future.cancel():
+            return True
+        if task is not None:
+            task.cancel()
+            return True
+        return False
+
+    def render_all(self, vizs: Iterable[Digraph],
+                   timeout: float | None = None) -> list[bytes | Exception]:
+        """
+        Render the graphs concurrently, in the order of the graphs, where
+        a failed render returns its exception. When the timeout (of the
+        whole batch) expires the remaining renders are cancelled.
+
+        Parameters
+        ----------------
+        vizs
+            Graphviz Digraph objects
+        timeout
+            Time budget of the batch, in seconds. Default: None
+
+        Returns
+        ----------------
+        renders
+            The rendered bytes or the exception of each graph
+        """
+        futures = [self.submit(viz) for viz in vizs]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        renders: list[bytes | Exception] = list()
+        for future in futures:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0, deadline - time.monotonic())
+            try:
+                renders.append(future.result(remaining))
+            except TimeoutError as error:
+                if not future.done():
+                    self.cancel(future)
+                    error = RenderTimeout("The batch exceeded its time "
+                                          "budget.")
+                renders.append(error)
+            except Exception as error:
+                renders.append(error)
+        return renders
+
+    def shutdown(self, cancel: bool = False) -> None:
+        """Stop the pool, cancelling the renders if specified."""
+        if cancel:
+            with self.lock:
+                futures = list(self.tasks)
+            for future in futures:
+                self.cancel(future)
+        self.executor.shutdown(wait=True, cancel_futures=cancel)
+
+render_pool = RenderPool(cache=render_cache)
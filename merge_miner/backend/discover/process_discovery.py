@@ -1,15 +1,23 @@
-from .types import AnimationData, default_animation_data, UnitsComparison
-from ..comparison import get_comparison_dfg, get_comparison_start_end_acts
+from .types import (AnimationData, default_animation_data,
+                    ComparisonParticipation)
+from ..comparison import get_comparison_data
+from ..types import unit_source_type
+from typing import Hashable, Iterable
 from .dfg_algorithms import employee_frequency
-from .animation import animation_data_handler
+from .animation import animation_data_handler, animation_steps_cache
 
 from pm4py.objects.heuristics_net import defaults
 
-from ..polars import (apply_dfg_performance, PerformanceParams, get_attribute_values)
-from ..constants import ACTIVITY_NAME
+from ..polars import (get_dfg_frequency_and_performance, PerformanceParams,
+                      performance_table_to_dfg, get_attribute_values)
+from ..polars.activity_time import get_activities_soj_time
+from ..constants import ACTIVITY_NAME, USER_KEY
 from ..utils import get_start_end_activities
-from .dfg_discovery import frequency_dfg
+from .dfg_discovery import filter_frequency_dfg
+from .discover_graphviz import (Digraph, render_cache, render_pool,
+                               render_to_bytes, layout_cache)
 import polars as pl
+import os
 from enum import Enum
 
 class Parameters(Enum):
@@ -28,6 +36,35 @@ class Parameters(Enum):
     START_END_NODES = "start_end_nodes"
     CLICKABLE_ARROWS = "clickable_arrows"
 
+RENDER_OUTPUTS = ("path", "bytes")
+
+def render_graph(viz: Digraph, output: str = "path",
+                 compress: bool = False,
+                 layout_key: Hashable | None = None) -> str | bytes:
+    '''
+    Render the graph to a file of the render cache ("path") or in memory
+    ("bytes"), piped to graphviz without touching the disk (but kept on
+    the hot tier of the render cache). The renders run on the render
+    pool, with its time budget and fallbacks. With a layout_key the nodes
+    keep the positions of the previous renders of the same view (see
+    LayoutCache).
+    '''
+    if output not in RENDER_OUTPUTS:
+        raise ValueError(f"{output} is not a valid render output!")
+    if layout_key is not None:
+        viz = layout_cache.get_layout(viz, layout_key)
+    if output == "bytes":
+        return render_to_bytes(viz, compress)
+
+    key = render_cache.get_viz_key(viz)
+    data = render_pool.submit(viz).result()
+    path = render_cache.get_path(key, viz.format)
+    if os.path.exists(path):
+        return path
+    # rendered by a fallback, which the pool doesn't store on the key of
+    # the graph (so the next requests try the full render again)
+    return render_cache.put(f"{key}-fallback", viz.format, data)
+
 class ProcessDiscovery:
     @staticmethod
     def get_dfg_params(**kwargs):
@@ -51,22 +88,51 @@ class ProcessDiscovery:
                                     defaults.DEFAULT_LOOP_LENGTH_TWO_THRESH),
             "participation_thresh": kwargs.get("participation_thresh", 2),
             "similarity_thresh": kwargs.get("similarity_thresh", 0.7),
+            "business_calendar": kwargs.get("business_calendar", None),
+            "activity_time": kwargs.get("activity_time", None),
+            "max_tokens": kwargs.get("max_tokens", None),
+            "tokens_bucket": kwargs.get("tokens_bucket", "monthly"),
+            "output": kwargs.get("output", "path"),
+            "compress": kwargs.get("compress", False),
+            "layout_key": kwargs.get("layout_key", None),
         }
         
     @staticmethod
     def comparison_directly_follows_graph(
-        dataframes: list[pl.DataFrame], **args
-    ) -> tuple[str, list[UnitsComparison]]:
+        dataframes: Iterable[unit_source_type], **args
+    ) -> tuple[str | bytes, ComparisonParticipation]:
+        '''
+        Return the svg file path where shows the comparison directly
+        follows graph of the units, along with the participation table of
+        each unit on the graph edges (part, source, target, unit,
+        frequency and passes columns), to filter and highlight the units
+        without another request.
+
+        Args:
+            dataframes (Iterable): The unit sources to be compared.
+            participation_thresh (int): The minimum number of units.
+            similarity_thresh (float): The threshold of each edge
+                comparing to the max frequency between the units.
+            trim_percentage (float): The percentage of edges to be trimmed.
+            file_format (str): The file format of the output file.
+            output (str, optional): "path" (default) or "bytes", to get
+                the rendered graph in memory, without files on disk.
+            compress (bool, optional): If the bytes are gzip compressed.
+            layout_key (Hashable, optional): The key of the view, to keep
+                the positions of the nodes between its renders.
+
+        Returns:
+            tuple[str | bytes, ComparisonParticipation]: The svg file path
+            (or bytes) and the participation table.
+        '''
         params = ProcessDiscovery.get_dfg_params(**args)
         participation_thresh = params["participation_thresh"]
         similarity_thresh = params["similarity_thresh"]
         trim_percentage = params["trim_percentage"]
 
-        freq_dfg = get_comparison_dfg(dataframes, similarity_thresh,
-                                      percentage=trim_percentage,
-                                      filter_count=participation_thresh)
-        sa, ea = get_comparison_start_end_acts(dataframes, similarity_thresh,
-                                               participation_thresh)
+        freq_dfg, (sa, ea), participation = get_comparison_data(
+            dataframes, similarity_thresh, percentage=trim_percentage,
+            filter_count=participation_thresh)
         activity_count: dict[str, int] = dict()
         for (a, b), count in freq_dfg.items():
             if a not in activity_count:
@@ -76,15 +142,16 @@ class ProcessDiscovery:
             activity_count[a] += count
             activity_count[b] += count
 
-        return dfg_visualizer(freq_dfg, comparison=True,
+        return render_graph(dfg_visualizer(freq_dfg, comparison=True,
             activity_count=activity_count, parameters={
                 Parameters.END_ACTIVITIES: ea,
                 Parameters.START_ACTIVITIES: sa,
                 Parameters.FORMAT: params["file_format"],
-            }).render()
+            }), params["output"], params["compress"], params["layout_key"]
+        ), participation.to_dict(as_series=False)
 
     @staticmethod
-    def directly_follows_graph(event_log: pl.DataFrame, **args) -> tuple[str, AnimationData]:
+    def directly_follows_graph(event_log: pl.DataFrame, **args) -> tuple[str | bytes, AnimationData]:
         '''
         Return the svg file path where shows the directly follows graph.
         All the parameters are optional. The parameters that will modify
@@ -99,29 +166,59 @@ class ProcessDiscovery:
             file_format (str): The file format of the output file.
             employee (str, optional): The employee to be analyzed.
             variant (str, optional): The variant of the graph.
+            business_calendar (BusinessCalendar, optional): The calendar
+                used to measure the performance in business time.
+            activity_time (str, optional): Color the activities by the
+                mean "service" or "waiting" time instead of the employee
+                activities frequency.
+            max_tokens (int, optional): Animate at most max_tokens cases
+                per edge per tokens_bucket (e.g. "monthly"), with the
+                counts of all the movements.
+            output (str, optional): "path" (default) or "bytes", to get
+                the rendered graph in memory, without files on disk.
+            compress (bool, optional): If the bytes are gzip compressed.
+            layout_key (Hashable, optional): The key of the view (e.g. the
+                unit and the employee), to keep the positions of the nodes
+                while the max_edges or keep_events change.
 
         Returns:
-            str: The svg file path where shows the directly follows graph.
+            str: The svg file path (or bytes) of the directly follows graph.
         '''
         params = ProcessDiscovery.get_dfg_params(**args)
-        freq_dfg = frequency_dfg(event_log, params["max_edges"],
-                                 params["keep_events"], 
-                                 params["trim_percentage"])
-
         employee = params["employee"]
-        perf_dfg, soj_time = freq_dfg, dict()
         is_employee_analysis = employee is not None
-        if params["variant"] != "frequency" or is_employee_analysis:
-            filter_key = "usuarioID" if is_employee_analysis else None
-            perf_dfg = apply_dfg_performance(event_log, parameters={
-                PerformanceParams.AGGREGATION_MEASURE: "median",
+        with_performance = (params["variant"] != "frequency"
+                            or is_employee_analysis)
+
+        filter_key = USER_KEY if is_employee_analysis else None
+        segment_dfgs, performance = get_dfg_frequency_and_performance(
+            event_log, params["trim_percentage"],
+            ["median"] if with_performance else [], parameters={
                 PerformanceParams.ACTIVITY_KEY: ACTIVITY_NAME,
                 PerformanceParams.FILTER_KEY: filter_key,
                 PerformanceParams.FILTER_VALUE: employee,
+                PerformanceParams.BUSINESS_CALENDAR:
+                    params["business_calendar"],
             })
+        freq_dfg = filter_frequency_dfg(*segment_dfgs, params["max_edges"],
+                                        params["keep_events"],
+                                        params["trim_percentage"])
+
+        perf_dfg, soj_time = freq_dfg, dict()
+        if with_performance:
+            perf_dfg = performance_table_to_dfg(performance, "median")
             if is_employee_analysis:
                 soj_time = employee_frequency(event_log, employee,
                                         activity_key=ACTIVITY_NAME)
+        if params["activity_time"] is not None:
+            soj_time = get_activities_soj_time(event_log,
+                params["activity_time"], parameters={
+                    PerformanceParams.ACTIVITY_KEY: ACTIVITY_NAME,
+                    PerformanceParams.FILTER_KEY: filter_key,
+                    PerformanceParams.FILTER_VALUE: employee,
+                    PerformanceParams.BUSINESS_CALENDAR:
+                        params["business_calendar"],
+                })
 
         start_acts, end_acts = get_start_end_activities(event_log)
 
@@ -129,12 +226,15 @@ class ProcessDiscovery:
         activity_count = get_attribute_values(event_log, ACTIVITY_NAME)
         if params["animated"]:
             animation_data = animation_data_handler(event_log, freq_dfg,
-                                                    perf_dfg, activity_count)
+                perf_dfg, activity_count, params["max_tokens"],
+                params["tokens_bucket"], animation_steps_cache)
 
-        return dfg_visualizer(freq_dfg, perf_dfg, activity_count, soj_time,
-            False, False, is_employee_analysis, parameters={
+        return render_graph(dfg_visualizer(freq_dfg, perf_dfg,
+            activity_count, soj_time, False, False, is_employee_analysis,
+            parameters={
                 Parameters.END_ACTIVITIES: end_acts,
                 Parameters.VARIANT: params["variant"],
                 Parameters.START_ACTIVITIES: start_acts,
                 Parameters.FORMAT: params["file_format"],
-            }).render(), animation_data
\ No newline at end of file
+            }), params["output"], params["compress"], params["layout_key"]
+        ), animation_data
\ No newline at end of file
@@ -1,4 +1,7 @@
 from .animation_types import (AnimationData, default_animation_data,
                               CircleStep, AnimationActivityData, 
-                              GetAnimationInfoReturn)
-from .comparison_types import UnitsComparison
+                              GetAnimationInfoReturn, AnimationPayloadEdge,
+                              AnimationPayloadColumn,
+                              AnimationPayloadManifest, AnimationChunk,
+                              AnimationBucketCount, SampledAnimationData)
+from .comparison_types import UnitsComparison, ComparisonParticipation
@@ -28,6 +28,43 @@ class AnimationData(TypedDict):
     edges: dict[str, list[CircleStep]]
     nodes: list[AnimationActivityData]
 
+class AnimationBucketCount(TypedDict):
+    edge: str
+    start_time: datetime
+    total: int
+    sampled: int
+
+class SampledAnimationData(AnimationData):
+    counts: list[AnimationBucketCount]
+
+class AnimationPayloadEdge(TypedDict):
+    key: str
+    offset: int
+    count: int
+
+class AnimationPayloadColumn(TypedDict):
+    name: str
+    dtype: str
+    offset: int
+    length: int
+
+class AnimationPayloadManifest(TypedDict):
+    format: str
+    start_time: str | None
+    end_time: str | None
+    total_duration: float
+    total_cases: int
+    medians: tuple[float, float]
+    nodes: list[AnimationActivityData]
+    activities: list[str]
+    edges: list[AnimationPayloadEdge]
+    columns: list[AnimationPayloadColumn]
+
+class AnimationChunk(TypedDict):
+    window_start: datetime
+    window_end: datetime
+    edges: dict[str, list[CircleStep]]
+
 default_animation_data: AnimationData = {
     "edges": {},
     "nodes": [],
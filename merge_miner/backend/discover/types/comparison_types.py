@@ -4,3 +4,11 @@ class UnitsComparison(TypedDict):
     id: str
     unidade_a: int | None
     unidade_b: int | None
+
+class ComparisonParticipation(TypedDict):
+    part: list[str]
+    source: list[str]
+    target: list[str]
+    unit: list[int]
+    frequency: list[float]
+    passes: list[bool]
@@ -174,30 +174,52 @@ def partition_case_dfgs(event_log: pl.DataFrame, percentage: float=0.1):
     dfgs, the second is the middle dfgs and the third is the end dfgs,
     where "dfg" is a tuple[str, str].
     """
-    get_trace_edges = lambda events: [
-        (events[i], events[i + 1]) for i in range(len(events) - 1)
-    ]
     for case in event_log.partition_by(CASE_CONCEPT_NAME):
         event_list = case.get_column(ACTIVITY_NAME).to_list()
-        start_events, middle_events, end_events = [], [], []
-        side_amount = ceil(len(event_list) * percentage)
+        yield partition_trace(event_list, percentage)
 
-        for i, event in enumerate(event_list):
-            if i < side_amount:
-                start_events.append(event)
-            elif i >= len(case) - side_amount:
-                end_events.append(event)
-            else:
-                middle_events.append(event)
-        if len(start_events) > len(end_events):
-            middle_events.insert(0, start_events.pop())
+def partition_trace(event_list: list[str], percentage: float=0.1
+                    ) -> tuple[list[tuple[str, str]], list[tuple[str, str]],
+                               list[tuple[str, str]]]:
+    """
+    Partition a single trace into the start, middle and end edges,
+    following the same rules of partition_case_dfgs.
 
-        if len(middle_events) == 0:
-            middle_events = [start_events[-1], end_events[0]]
+    Parameters
+    ------------
+    event_list
+        The activities of the case ordered by timestamp
+    percentage
+        Percentage of the trace to be considered as start and end dfgs.
+        Defaults to 0.1 (10%)
+
+    Returns
+    ------------
+    tuple[list[dfg], list[dfg], list[dfg]]: The start, middle and end
+    edges of the trace.
+    """
+    get_trace_edges = lambda events: [
+        (events[i], events[i + 1]) for i in range(len(events) - 1)
+    ]
+    start_events, middle_events, end_events = [], [], []
+    side_amount = ceil(len(event_list) * percentage)
+
+    for i, event in enumerate(event_list):
+        if i < side_amount:
+            start_events.append(event)
+        elif i >= len(event_list) - side_amount:
+            end_events.append(event)
         else:
-            start_events.append(middle_events[0])
-            end_events.insert(0, middle_events[-1])
+            middle_events.append(event)
+    if len(start_events) > len(end_events):
+        middle_events.insert(0, start_events.pop())
+
+    if len(middle_events) == 0:
+        middle_events = [start_events[-1], end_events[0]]
+    else:
+        start_events.append(middle_events[0])
+        end_events.insert(0, middle_events[-1])
 
-        yield (get_trace_edges(start_events),
-               get_trace_edges(middle_events),
-               get_trace_edges(end_events))
\ No newline at end of file
+    return (get_trace_edges(start_events),
+            get_trace_edges(middle_events),
+            get_trace_edges(end_events))
\ No newline at end of file
@@ -1,2 +1,10 @@
 from .performance import apply_dfg_performance, Parameters as PerformanceParams
-from .statistics import get_attribute_values
\ No newline at end of file
+from .performance import get_dfg_performance_table, performance_table_to_dfg
+from .performance import get_dfg_duration_sketches, get_dfg_frequency_and_performance
+from .performance import get_windowed_dfg_performance, get_dfg_duration_histograms
+from .activity_time import get_activity_times_table, get_activities_soj_time
+from .wip import get_wip_curve
+from .quantile_sketch import TDigest
+from .statistics import get_attribute_values
+from .business_hours import business_hours_diff_expr
+from .business_calendar import BusinessCalendar, national_holidays
\ No newline at end of file
@@ -0,0 +1,161 @@
+import polars as pl
+from typing import Any, Iterable
+
+from pm4py.util import exec_utils
+from ..constants import CASE_CONCEPT_NAME, START_TIMESTAMP_NAME
+from pm4py.util import xes_constants as xes_util
+from .performance import (Parameters, get_duration_expr, get_statistic_expr,
+                          PERFORMANCE_STATISTICS)
+
+ACTIVITY_TIME_MEASURES = ("service", "waiting")
+
+def get_events_activity_times(
+    dataframe: pl.DataFrame | pl.LazyFrame,
+    parameters: dict[str | Parameters, Any] | None = None,
+    keys: Iterable[str] = ()
+) -> pl.LazyFrame:
+    """
+    Get the service time (end - start) and the waiting time (start - end
+    of the previous event of the case) of each event, in seconds. The
+    waiting time of the first event of each case is null and the
+    overlapping events have no waiting time.
+
+    Parameters
+    ----------
+    dataframe
+        Log with the start and end timestamps
+    parameters
+        The parameters of apply_dfg_performance (the start timestamp key
+        defaults to START_TIMESTAMP_NAME), where the business parameters
+        are applied to both times
+    keys
+        Other attributes of the events kept (e.g. USER_KEY)
+
+    Returns
+    -------
+    events
+        LazyFrame with the case, activity, keys, service and waiting
+        columns
+    """
+    if parameters is None: parameters = {}
+
+    case_key = exec_utils.get_param_value(
+        Parameters.CASE_KEY, parameters, CASE_CONCEPT_NAME)
+    activity_key = exec_utils.get_param_value(
+        Parameters.ACTIVITY_KEY, parameters, xes_util.DEFAULT_NAME_KEY)
+    start_timestamp_key = exec_utils.get_param_value(
+        Parameters.START_TIMESTAMP_KEY, parameters, START_TIMESTAMP_NAME)
+    timestamp_key = exec_utils.get_param_value(Parameters.TIMESTAMP_KEY,
+                             parameters, xes_util.DEFAULT_TIMESTAMP_KEY)
+
+    columns = [case_key, activity_key, start_timestamp_key, timestamp_key]
+    columns += [key for key in keys if key not in columns]
+    events = (dataframe.lazy().select(columns)
+        .sort([case_key, timestamp_key, start_timestamp_key])
+        .with_columns(
+            pl.when(pl.col(case_key) == pl.col(case_key).shift(1))
+              .then(pl.col(timestamp_key).shift(1))
+              .alias("previous_timestamp")))
+
+    return events.with_columns(
+        get_duration_expr(start_timestamp_key, timestamp_key, parameters,
+                          True).clip(lower_bound=0).alias("service"),
+        get_duration_expr("previous_timestamp", start_timestamp_key,
+                          parameters, True).clip(lower_bound=0)
+                          .alias("waiting"),
+    ).drop("previous_timestamp")
+
+def get_activity_times_table(
+    dataframe: pl.DataFrame | pl.LazyFrame,
+    statistics: Iterable[str] = PERFORMANCE_STATISTICS,
+    group_keys: Iterable[str] = (),
+    parameters: dict[str | Parameters, Any] | None = None
+) -> pl.DataFrame:
+    """
+    Aggregate the service and waiting times of the events per activity
+    (and per group, e.g. employee) in a single aggregation.
+
+    Parameters
+    ----------
+    dataframe
+        Log with the start and end timestamps
+    statistics
+        The statistics to compute (see get_statistic_expr).
+        Default: mean, median, min, max, sum, stdev and count
+    group_keys
+        The columns that also group the events, e.g. [USER_KEY].
+        Default: only the activity
+    parameters
+        The parameters of get_events_activity_times
+
+    Returns
+    -------
+    activity_times
+        DataFrame with the group keys, the activity column and the
+        service_<statistic> and waiting_<statistic> columns
+    """
+    if parameters is None: parameters = {}
+    group_keys = list(group_keys)
+    activity_key = exec_utils.get_param_value(
+        Parameters.ACTIVITY_KEY, parameters, xes_util.DEFAULT_NAME_KEY)
+
+    aggregations = [
+        get_statistic_expr(statistic, measure).alias(f"{measure}_{statistic}")
+        for measure in ACTIVITY_TIME_MEASURES for statistic in statistics
+    ]
+    return (get_events_activity_times(dataframe, parameters, group_keys)
+        .group_by(*group_keys, activity_key)
+        .agg(aggregations)
+        .rename({ activity_key: "activity" })
+        .sort(*group_keys, "activity")
+        .collect())
+
+def get_activities_soj_time(
+    dataframe: pl.DataFrame | pl.LazyFrame,
+    measure: str = "service",
+    statistic: str = "mean",
+    parameters: dict[str | Parameters, Any] | None = None
+) -> dict[str, float]:
+    """
+    Get the service or waiting time of each activity, in the format of
+    get_activities_color_soj_time.
+
+    Parameters
+    ----------
+    dataframe
+        Log with the start and end timestamps
+    measure
+        "service" or "waiting". Default: service
+    statistic
+        The statistic of the times (see get_statistic_expr). Default: mean
+    parameters
+        The parameters of get_events_activity_times. With the filter key
+        and value (e.g. USER_KEY and the employee) only the events of the
+        value are aggregated, where the waiting times are still measured
+        from the previous event of the case, of any value
+
+    Returns
+    -------
+    soj_time
+        Dictionary of the time (in seconds) of each activity
+    """
+    if measure not in ACTIVITY_TIME_MEASURES:
+        raise ValueError(f"{measure} is not a valid activity time!")
+    if parameters is None: parameters = {}
+    filter_key = exec_utils.get_param_value(Parameters.FILTER_KEY,
+                                            parameters, None)
+    filter_value = exec_utils.get_param_value(Parameters.FILTER_VALUE,
+                                              parameters, None)
+
+    column = f"{measure}_{statistic}"
+    if filter_key is not None and filter_value is not None:
+        # grouped over the whole log, so the times use the case events
+        table = get_activity_times_table(dataframe, [statistic],
+            [filter_key], parameters).filter(
+            pl.col(filter_key) == filter_value)
+    else:
+        table = get_activity_times_table(dataframe, [statistic],
+                                         parameters=parameters)
+    return { activity: value if value is not None else 0.0
+             for activity, value in table.select("activity", column)
+                                         .iter_rows() }
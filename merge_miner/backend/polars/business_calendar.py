@@ -0,0 +1,245 @@
+from datetime import date, datetime, timedelta
+from ..constants import TIMESTAMP_NAME
+from .business_hours import DAY_IN_SECONDS, unify_hour_slots
+from typing import Iterable
+import polars as pl
+import numpy as np
+
+MINUTE_IN_SECONDS = 60
+DAY_IN_MICROSECONDS = DAY_IN_SECONDS * 1_000_000
+MINUTE_IN_MICROSECONDS = MINUTE_IN_SECONDS * 1_000_000
+EPOCH_DATE = date(1970, 1, 1)
+# Forensic recess of the courts, from December 20 to January 20 (inclusive)
+FORENSIC_RECESS = ((12, 20), (1, 20))
+CALENDAR_RESOLUTIONS = ("day", "minute")
+
+def easter_sunday(year: int) -> date:
+    """
+    Get the date of the Easter Sunday of the year, by the anonymous
+    gregorian algorithm.
+    """
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+def national_holidays(years: Iterable[int]) -> list[date]:
+    """
+    Get the brazilian national holidays of the years, including the Good
+    Friday. Local holidays (e.g. of the state or the city of the court)
+    must be added by the caller.
+
+    Parameters
+    ----------
+    years
+        The years of the holidays
+
+    Returns
+    -------
+    holidays
+        The sorted dates of the holidays
+    """
+    holidays = list()
+    for year in years:
+        fixed = [(1, 1), (4, 21), (5, 1), (9, 7), (10, 12), (11, 2),
+                 (11, 15), (12, 25)]
+        if year >= 2024:
+            fixed.append((11, 20))
+        holidays.extend(date(year, month, day) for month, day in fixed)
+        holidays.append(easter_sunday(year) - timedelta(days=2))
+    return sorted(holidays)
+
+def is_in_recess(day: date, recess: tuple[tuple[int, int], tuple[int, int]]
+                 ) -> bool:
+    """
+    Check if the day is inside the recess, given as the (month, day) of its
+    first and last days. The recess may cross the year boundary.
+    """
+    first, last = recess
+    month_day = (day.month, day.day)
+    if first <= last:
+        return first <= month_day <= last
+    return month_day >= first or month_day <= last
+
+class BusinessCalendar:
+    """
+    Business calendar over a range of dates, with weekends, holidays and
+    recess periods, where the cumulative business seconds are precomputed
+    at day or minute resolution. The business duration of any interval is
+    then two lookups on the index and a subtraction.
+
+    With the "day" resolution the index has one value per day and the
+    seconds of the current day are looked up on the hour slots, while the
+    "minute" resolution has one value per minute (more memory, simpler
+    lookups), exact when the work timing is on whole minutes.
+    The timestamps out of the range of the calendar have no business time.
+    """
+    def __init__(self, start_date: date, end_date: date,
+                 worktiming: list[float] = [7, 17],
+                 weekends: list[int] = [6, 7],
+                 holidays: Iterable[date] | None = None,
+                 recesses: Iterable[tuple[tuple[int, int], tuple[int, int]]]
+                    = (FORENSIC_RECESS,),
+                 resolution: str = "day"):
+        """
+        Parameters
+        ----------
+        start_date
+            The first day of the calendar
+        end_date
+            The last day of the calendar
+        worktiming
+            The work schedule of a business day, as pairs of start and end
+            hours. Example: [8, 12, 13, 17]. Default: [7, 17]
+        weekends
+            Indexes of the days of the week that are weekend.
+            Default: [6, 7] (Saturday and Sunday)
+        holidays
+            The dates without business time. Default: the national holidays
+            of the years of the calendar
+        recesses
+            The recess periods, as the (month, day) of the first and last
+            days, repeated every year. Default: the forensic recess
+        resolution
+            "day" or "minute". Default: "day"
+        """
+        if resolution not in CALENDAR_RESOLUTIONS:
+            raise ValueError(f"{resolution} is not a valid resolution!")
+        if isinstance(start_date, datetime): start_date = start_date.date()
+        if isinstance(end_date, datetime): end_date = end_date.date()
+        if holidays is None:
+            holidays = national_holidays(
+                range(start_date.year, end_date.year + 1))
+
+        self.start_date = start_date
+        self.end_date = end_date
+        self.resolution = resolution
+        self.hour_slots = unify_hour_slots([
+            (round(worktiming[i] * 3600), round(worktiming[i + 1] * 3600))
+            for i in range(0, len(worktiming) - 1, 2)])
+
+        holidays = set(holidays)
+        recesses = list(recesses)
+        days = [start_date + timedelta(days=i)
+                for i in range((end_date - start_date).days + 1)]
+        self.business_days = np.array([
+            day.isoweekday() not in weekends and day not in holidays
+            and not any(is_in_recess(day, recess) for recess in recesses)
+            for day in days], dtype=bool)
+
+        if resolution == "day":
+            self.step = DAY_IN_MICROSECONDS
+            day_seconds = sum(end - begin for begin, end in self.hour_slots)
+            step_seconds = self.business_days * day_seconds
+            # business seconds available at each step, used on the lookup
+            self.step_open = self.business_days.astype(np.int64)
+        else:
+            self.step = MINUTE_IN_MICROSECONDS
+            minutes = np.arange(DAY_IN_SECONDS // MINUTE_IN_SECONDS
+                                ) * MINUTE_IN_SECONDS
+            minute_seconds = np.zeros(len(minutes), dtype=np.int64)
+            for begin, end in self.hour_slots:
+                minute_seconds += np.clip(
+                    np.minimum(minutes + MINUTE_IN_SECONDS, end)
+                    - np.maximum(minutes, begin), 0, MINUTE_IN_SECONDS)
+            step_seconds = np.outer(self.business_days, minute_seconds
+                                    ).ravel()
+            self.step_open = step_seconds
+
+        self.cumulative_seconds = np.concatenate(
+            ([0], np.cumsum(step_seconds, dtype=np.int64)))
+        self.first_step = ((start_date - EPOCH_DATE).days
+                           * (DAY_IN_MICROSECONDS // self.step))
+
+    @classmethod
+    def from_dataframe(cls, dataframe: pl.DataFrame | pl.LazyFrame,
+                       timestamp_keys: Iterable[str] = (TIMESTAMP_NAME,),
+                       **kwargs) -> "BusinessCalendar":
+        """
+        Create the calendar covering the date range of the timestamp
+        columns of the log. The remaining keyword arguments are passed to
+        the constructor.
+        """
+        timestamp_keys = list(timestamp_keys)
+        bounds = dataframe.lazy().select(
+            pl.min_horizontal(pl.col(timestamp_keys).min()).alias("start"),
+            pl.max_horizontal(pl.col(timestamp_keys).max()).alias("end"),
+        ).collect().row(0)
+        return cls(bounds[0], bounds[1], **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.business_days)
+
+    def is_business_day(self, day: date) -> bool:
+        index = (day - self.start_date).days
+        return 0 <= index < len(self) and bool(self.business_days[index])
+
+    def business_time_expr(self, timestamp: str | pl.Expr) -> pl.Expr:
+        """
+        Expression of the cumulative business seconds from the start of the
+        calendar until the timestamp.
+
+        Parameters
+        ----------
+        timestamp
+            Column name or expression of a (timezone naive) datetime
+
+        Returns
+        -------
+        expr
+            Float expression of the cumulative business seconds
+        """
+        if isinstance(timestamp, str):
+            timestamp = pl.col(timestamp)
+        steps_amount = len(self.cumulative_seconds) - 1
+        microseconds = timestamp.dt.epoch("us")
+        absolute_step = microseconds // self.step
+        step = absolute_step - self.first_step
+        elapsed = (microseconds - absolute_step * self.step) / 1e6
+
+        cumulative = pl.lit(pl.Series(self.cumulative_seconds)).gather(
+            step.clip(0, steps_amount))
+        open_seconds = pl.lit(pl.Series(self.step_open)).gather(
+            step.clip(0, steps_amount - 1))
+        if self.resolution == "day":
+            current = pl.lit(0.0)
+            for begin, end in self.hour_slots:
+                current = current + (elapsed - begin).clip(0, end - begin)
+            current = current * open_seconds
+        else:
+            current = pl.min_horizontal(elapsed, open_seconds)
+        inside = (step >= 0) & (step < steps_amount)
+        return cumulative + pl.when(inside).then(current).otherwise(0.0)
+
+    def diff_expr(self, start_timestamp: str | pl.Expr,
+                  end_timestamp: str | pl.Expr) -> pl.Expr:
+        """
+        Expression of the business seconds between two timestamp columns.
+
+        Parameters
+        ----------
+        start_timestamp
+            Column name or expression of the start datetime
+        end_timestamp
+            Column name or expression of the end datetime
+
+        Returns
+        -------
+        expr
+            Float expression of the business seconds (0 when the end is
+            before the start)
+        """
+        return (self.business_time_expr(end_timestamp)
+                - self.business_time_expr(start_timestamp)
+                ).clip(lower_bound=0)
+
+    def business_seconds(self, start: datetime, end: datetime) -> float:
+        """Business seconds between two datetimes."""
+        return pl.select(self.diff_expr(pl.lit(start), pl.lit(end))).item()
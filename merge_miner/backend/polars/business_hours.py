@@ -0,0 +1,92 @@
+import polars as pl
+
+DAY_IN_SECONDS = 24 * 60 * 60
+WEEK_IN_SECONDS = 7 * DAY_IN_SECONDS
+# 1970-01-01 was a Thursday, so the first week starts 3 days before the epoch
+EPOCH_WEEK_OFFSET = 3 * DAY_IN_SECONDS
+
+def unify_hour_slots(hour_slots: list[tuple[int, int]]
+                     ) -> list[tuple[int, int]]:
+    """
+    Union of the business hour slots in order to avoid overlapping
+    business hours, with the same rules of pm4py BusinessHours.
+
+    Parameters
+    ----------
+    hour_slots
+        A list of tuples where each tuple is the start and end of a slot
+        in seconds since the week start (Monday 00:00)
+
+    Returns
+    -------
+    hour_slots
+        The sorted slots without overlaps
+    """
+    unified_slots: list[list[int]] = []
+    for begin, end in sorted(hour_slots):
+        if unified_slots and unified_slots[-1][1] >= begin - 1:
+            unified_slots[-1][1] = max(unified_slots[-1][1], end)
+        else:
+            unified_slots.append([begin, end])
+    return [(begin, end) for begin, end in unified_slots]
+
+def business_time_expr(timestamp: str | pl.Expr,
+                       hour_slots: list[tuple[int, int]]) -> pl.Expr:
+    """
+    Expression of the cumulative business seconds elapsed from the first
+    week before the epoch until the timestamp, i.e. the whole weeks times
+    the business seconds of a week plus the business seconds of the
+    current week until the timestamp, looked up on the slots.
+
+    Parameters
+    ----------
+    timestamp
+        Column name or expression of a (timezone naive) datetime
+    hour_slots
+        Business hour slots, as returned by get_hour_slots
+
+    Returns
+    -------
+    expr
+        Float expression of the cumulative business seconds
+    """
+    if isinstance(timestamp, str):
+        timestamp = pl.col(timestamp)
+    hour_slots = unify_hour_slots(hour_slots)
+    week_business_seconds = sum(end - begin for begin, end in hour_slots)
+
+    seconds = timestamp.dt.epoch("us") / 1e6 + EPOCH_WEEK_OFFSET
+    weeks = (seconds / WEEK_IN_SECONDS).floor()
+    week_seconds = seconds - weeks * WEEK_IN_SECONDS
+
+    business_seconds = weeks * week_business_seconds
+    for begin, end in hour_slots:
+        business_seconds = business_seconds + (
+            (week_seconds - begin).clip(0, end - begin))
+    return business_seconds
+
+def business_hours_diff_expr(start_timestamp: str | pl.Expr,
+                             end_timestamp: str | pl.Expr,
+                             hour_slots: list[tuple[int, int]]) -> pl.Expr:
+    """
+    Expression of the business seconds between two timestamp columns,
+    vectorized equivalent of pm4py soj_time_business_hours_diff.
+
+    Parameters
+    ----------
+    start_timestamp
+        Column name or expression of the start datetime
+    end_timestamp
+        Column name or expression of the end datetime
+    hour_slots
+        Business hour slots, as returned by get_hour_slots
+
+    Returns
+    -------
+    expr
+        Float expression of the business seconds (0 when the end is
+        before the start)
+    """
+    return (business_time_expr(end_timestamp, hour_slots)
+            - business_time_expr(start_timestamp, hour_slots)
+            ).clip(lower_bound=0)
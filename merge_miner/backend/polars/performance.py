@@ -1,13 +1,17 @@
 import polars as pl
+import numpy as np
 from enum import Enum
-from typing import Any
+from typing import Any, Iterable
+from collections import Counter
 
 from ..types import dfg_type
 from pm4py.util import constants, exec_utils
 from ..constants import CASE_CONCEPT_NAME
 from pm4py.util import xes_constants as xes_util
 from .utils import get_hour_slots
-from pm4py.util.business_hours import soj_time_business_hours_diff
+from .business_hours import business_hours_diff_expr
+from .business_calendar import BusinessCalendar
+from .quantile_sketch import TDigest
 
 class Parameters(Enum):
     START_TIMESTAMP_KEY = constants.PARAMETER_CONSTANT_START_TIMESTAMP_KEY
@@ -16,61 +20,169 @@ class Parameters(Enum):
     CASE_KEY = constants.PARAMETER_CONSTANT_CASEID_KEY
     AGGREGATION_MEASURE = "aggregation_measure"
     BUSINESS_HOURS = "business_hours"
+    BUSINESS_CALENDAR = "business_calendar"
     FILTER_VALUE = "filter_value"
     WORKTIMING = "worktiming"
     FILTER_KEY = "filter_key"
     WEEKENDS = "weekends"
+    SKETCH_COMPRESSION = "sketch_compression"
+    SHARDS_AMOUNT = "shards_amount"
+    HISTOGRAM_BINS = "histogram_bins"
 
-def apply_dfg_performance(
-    dataframe: pl.DataFrame,
-    parameters: dict[str | Parameters, Any] | None = None
-) -> dfg_type:
+WINDOW_INTERVALS = {
+    "weekly": "1w", "monthly": "1mo", "quarterly": "3mo", "yearly": "1y",
+}
+PERFORMANCE_STATISTICS = ("mean", "median", "min", "max", "sum", "stdev",
+                          "count")
+
+def get_duration_expr(
+    start_timestamp: str | pl.Expr, end_timestamp: str | pl.Expr,
+    parameters: dict[str | Parameters, Any] | None = None,
+    duration_in_seconds: bool = False
+) -> pl.Expr:
     """
-    Measure performance between couples of attributes in the DFG graph
+    Expression of the duration between two timestamps, in business time
+    when the business calendar or the business hours are specified.
 
     Parameters
     ----------
-    log
-        Log
+    start_timestamp
+        Column name or expression of the start datetime
+    end_timestamp
+        Column name or expression of the end datetime
     parameters
-        Possible parameters passed to the algorithms:
-            aggregationMeasure -> performance aggregation measure (min, 
-                max, mean, median, sum, all, stdev, raw_values). Default:
-                mean
-            case_key -> Attribute to use as case
-            activity_key -> Attribute to use as activity
-            timestamp_key -> Attribute to use as timestamp
-            start_timestamp_key -> Attribute to use as start timestamp
-        - Parameters.BUSINESS_HOURS => calculates the difference of time
-            based on the business hours, not the total time. Default: False
-        - Parameters.WORKTIMING => work schedule of the company (provided
-            as a list where the first number is the start of the work
-            time, and the second number is the end of the work time), if
-            business hours are enabled Default: [7, 17] (work shift from
-            07:00 to 17:00)
-        - Parameters.WEEKENDS => indexes of the days of the week that are 
-            weekend Default: [6, 7] (weekends are Saturday and Sunday)
-        - Parameters.FILTER_KEY => attribute to filter by
-        - Parameters.FILTER_VALUE => value to filter by
+        The business parameters of apply_dfg_performance (BUSINESS_HOURS,
+        WORKTIMING, WEEKENDS and BUSINESS_CALENDAR)
+    duration_in_seconds
+        If the duration without business hours is converted to float
+        seconds instead of a polars Duration. Default: False
 
     Returns
     -------
-    dfg
-        DFG graph
+    expr
+        The duration expression (the business durations are always float
+        seconds)
     """
-    def apply_soj_time(df: pl.DataFrame):
-        """
-        Slower version of the sojourn time calculation, to works
-        with polars DataFrame map_batches method.
-        """
-        time_index = df.columns.index(timestamp_key)
+    if parameters is None: parameters = {}
+    if isinstance(start_timestamp, str):
+        start_timestamp = pl.col(start_timestamp)
+    if isinstance(end_timestamp, str):
+        end_timestamp = pl.col(end_timestamp)
+
+    business_hours = exec_utils.get_param_value(
+        Parameters.BUSINESS_HOURS, parameters, False)
+    worktiming = exec_utils.get_param_value(Parameters.WORKTIMING,
+                                            parameters, [7, 17])
+    weekends = exec_utils.get_param_value(Parameters.WEEKENDS,
+                                          parameters, [6, 7])
+    business_calendar: BusinessCalendar | None = exec_utils.get_param_value(
+        Parameters.BUSINESS_CALENDAR, parameters, None)
+
+    if business_calendar is not None:
+        return business_calendar.diff_expr(start_timestamp, end_timestamp)
+    if business_hours:
         hour_slots = get_hour_slots(worktiming, weekends)
-        next_time_index = df.columns.index("next_start_timestamp")
-        duration = df.map_rows(lambda y: soj_time_business_hours_diff(
-            y[time_index], y[next_time_index], hour_slots)
-        ).rename({ "map": "duration" })
-        return df.with_columns(duration = duration["duration"])
+        return business_hours_diff_expr(start_timestamp, end_timestamp,
+                                        hour_slots)
+    duration = end_timestamp - start_timestamp
+    if duration_in_seconds:
+        duration = duration.dt.total_microseconds() / 1e6
+    return duration
+
+def add_segment_column(events: pl.LazyFrame, case_key: str,
+                       percentage: float = 0.1) -> pl.LazyFrame:
+    """
+    Add the segment (start, middle or end) of the edge that starts on each
+    event of the cases, the vectorized equivalent of partition_trace. The
+    events must be sorted by case.
+
+    Parameters
+    ----------
+    events
+        The events sorted by case
+    case_key
+        Attribute to use as case
+    percentage
+        Percentage of the trace to be considered as start and end.
+        Default: 0.1
+
+    Returns
+    -------
+    events
+        The events with the segment string column
+    """
+    # the cases are contiguous, so the runs identify them cheaply
+    events = events.with_columns(
+        pl.col(case_key).rle_id().alias("_case_run"),
+        pl.int_range(pl.len(), dtype=pl.Int64).alias("_row"))
+    events = events.with_columns(
+        pl.len().over("_case_run").cast(pl.Int64).alias("_length"),
+        (pl.col("_row") - pl.col("_row").min().over("_case_run")
+         ).alias("_position"))
 
+    length, position = pl.col("_length"), pl.col("_position")
+    side_amount = (length * percentage).ceil().cast(pl.Int64)
+    events = events.with_columns(
+        pl.min_horizontal(side_amount, length).alias("_start_length"),
+        (length - pl.max_horizontal(side_amount, length - side_amount)
+         ).alias("_end_length"))
+    # the last start event moves to the middle when start > end
+    start_length, end_length = pl.col("_start_length"), pl.col("_end_length")
+    events = events.with_columns(
+        pl.when(start_length > end_length).then(start_length - 1)
+          .otherwise(start_length).alias("_start_length"))
+    middle_length = length - start_length - end_length
+
+    return events.with_columns(
+        pl.when(middle_length == 0).then(
+            pl.when(position < start_length - 1).then(pl.lit("start"))
+            .when(position == start_length - 1).then(pl.lit("middle"))
+            .otherwise(pl.lit("end")))
+        .when(position < start_length).then(pl.lit("start"))
+        .when(position >= length - end_length - 1).then(pl.lit("end"))
+        .otherwise(pl.lit("middle")).alias("segment")
+    ).drop("_case_run", "_row", "_length", "_position", "_start_length",
+           "_end_length")
+
+def get_successive_rows(
+    dataframe: pl.DataFrame | pl.LazyFrame,
+    parameters: dict[str | Parameters, Any] | None = None,
+    duration_in_seconds: bool = False,
+    percentage: float | None = None,
+    apply_filter: bool = True,
+    keys: Iterable[str] = ()
+) -> pl.LazyFrame:
+    """
+    Get the successive events of each case (the DFG edges occurrences)
+    along with the duration between them, shared by the performance
+    measures of the DFG.
+
+    Parameters
+    ----------
+    dataframe
+        Log
+    parameters
+        The same parameters of apply_dfg_performance (the aggregation
+        measure is ignored)
+    duration_in_seconds
+        If the duration without business hours is converted to float
+        seconds instead of a polars Duration. Default: False
+    percentage
+        If specified, the segment column labels each edge occurrence as
+        start, middle or end of the case, with the same rules (and
+        percentage) of partition_trace (see add_segment_column). Default: None
+    apply_filter
+        If the filter key and value parameters are applied. Default: True
+    keys
+        Other attributes of the events kept on the rows (e.g. the
+        employee of the source event). Default: no other attribute
+
+    Returns
+    -------
+    successive_rows
+        LazyFrame with the columns of the event, the next_activity,
+        next_start_timestamp, duration and optionally the segment
+    """
     if parameters is None: parameters = {}
 
     case_key = exec_utils.get_param_value(
@@ -81,21 +193,13 @@ def apply_dfg_performance(
         Parameters.START_TIMESTAMP_KEY, parameters, None)
     timestamp_key = exec_utils.get_param_value(Parameters.TIMESTAMP_KEY,
                              parameters, xes_util.DEFAULT_TIMESTAMP_KEY)
-    aggregation_measure = exec_utils.get_param_value(
-        Parameters.AGGREGATION_MEASURE, parameters, "mean")
-
-    business_hours = exec_utils.get_param_value(
-        Parameters.BUSINESS_HOURS, parameters, False)
-    worktiming = exec_utils.get_param_value(Parameters.WORKTIMING,
-                                            parameters, [7, 17])
-    weekends = exec_utils.get_param_value(Parameters.WEEKENDS,
-                                          parameters, [6, 7])
 
     filter_key = exec_utils.get_param_value(Parameters.FILTER_KEY,
                                             parameters, None)
     filter_value = exec_utils.get_param_value(Parameters.FILTER_VALUE,
                                               parameters, None)
 
+    dataframe = dataframe.lazy()
     if start_timestamp_key is None:
         start_timestamp_key = "start_timestamp"
         dataframe = dataframe.with_columns(
@@ -107,29 +211,476 @@ def apply_dfg_performance(
         start_timestamp_key, timestamp_key,
     ]
     if filter_key is None: columns_to_filter.remove(None)
+    columns_to_filter += [key for key in keys
+                          if key not in columns_to_filter]
     events = dataframe.select(columns_to_filter).sort([
         case_key, timestamp_key, start_timestamp_key])
-    shifted = events.shift(-1)
+    if percentage is not None:
+        events = add_segment_column(events, case_key, percentage)
 
-    df_successive_rows = events.lazy().with_columns(
-        next_case = shifted.get_column(case_key),
-        next_activity = shifted.get_column(activity_key),
+    df_successive_rows = events.with_columns(
+        next_case = pl.col(case_key).shift(-1),
+        next_activity = pl.col(activity_key).shift(-1),
         duration = pl.lit(0.0, dtype=pl.Float64),
-        next_start_timestamp = shifted.get_column(start_timestamp_key),
+        next_start_timestamp = pl.col(start_timestamp_key).shift(-1),
     ).filter(pl.col(case_key) == pl.col("next_case"))
 
-    if business_hours:
-        df_successive_rows = df_successive_rows.map_batches(
-            apply_soj_time, projection_pushdown=False)
-    else:
-        df_successive_rows = df_successive_rows.with_columns(
-            (pl.col("next_start_timestamp")
-             - pl.col(timestamp_key)).alias("duration"))
+    df_successive_rows = df_successive_rows.with_columns(
+        get_duration_expr(timestamp_key, "next_start_timestamp", parameters,
+                          duration_in_seconds).alias("duration"))
     
-    if filter_key is not None and filter_value is not None:
+    if (apply_filter and filter_key is not None
+        and filter_value is not None):
         df_successive_rows = df_successive_rows.filter(
             pl.col(filter_key) == filter_value)
-    
+
+    return df_successive_rows
+
+def get_statistic_expr(statistic: str,
+                       column: str = "duration") -> pl.Expr:
+    """
+    Get the aggregation expression of a performance statistic.
+
+    Parameters
+    ----------
+    statistic
+        One of mean, median, min, max, sum, stdev, count, iqr or a
+        percentile as pNN (e.g. p10, p90, p99.9)
+    column
+        The column to aggregate. Default: duration
+
+    Returns
+    -------
+    expr
+        The aggregation expression, aliased as the statistic
+    """
+    values = pl.col(column)
+    if statistic == "mean":
+        expr = values.mean()
+    elif statistic == "median":
+        expr = values.median()
+    elif statistic == "min":
+        expr = values.min()
+    elif statistic == "max":
+        expr = values.max()
+    elif statistic == "sum":
+        expr = values.sum()
+    elif statistic == "stdev":
+        expr = values.std()
+    elif statistic == "count":
+        expr = values.count()
+    elif statistic == "iqr":
+        expr = (values.quantile(0.75, "linear")
+                - values.quantile(0.25, "linear"))
+    elif statistic.startswith("p"):
+        try:
+            percentile = float(statistic[1:])
+        except ValueError:
+            percentile = -1
+        if not 0 <= percentile <= 100:
+            raise ValueError(f"{statistic} is not a valid statistic!")
+        expr = values.quantile(percentile / 100, "linear")
+    else:
+        raise ValueError(f"{statistic} is not a valid statistic!")
+    return expr.alias(statistic)
+
+def get_dfg_performance_table(
+    dataframe: pl.DataFrame,
+    statistics: Iterable[str] = PERFORMANCE_STATISTICS,
+    parameters: dict[str | Parameters, Any] | None = None
+) -> pl.DataFrame:
+    """
+    Measure several performance statistics of the DFG edges in a single
+    aggregation, returning a columnar table with one row per edge, so the
+    measure can be switched without scanning the log again.
+
+    Parameters
+    ----------
+    dataframe
+        Log
+    statistics
+        The statistics to compute (see get_statistic_expr).
+        Default: mean, median, min, max, sum, stdev and count
+    parameters
+        The same parameters of apply_dfg_performance (the aggregation
+        measure is ignored)
+
+    Returns
+    -------
+    performance_table
+        DataFrame with the source and target columns of the edges and one
+        column per statistic, where the durations are in seconds
+    """
+    if parameters is None: parameters = {}
+    activity_key = exec_utils.get_param_value(
+        Parameters.ACTIVITY_KEY, parameters, xes_util.DEFAULT_NAME_KEY)
+
+    return (get_successive_rows(dataframe, parameters, True)
+        .group_by(activity_key, "next_activity", maintain_order=True)
+        .agg([get_statistic_expr(statistic) for statistic in statistics])
+        .rename({ activity_key: "source", "next_activity": "target" })
+        .collect())
+
+def performance_table_to_dfg(performance_table: pl.DataFrame,
+                             statistic: str) -> dfg_type:
+    """
+    Get the performance DFG of one statistic of the performance table.
+    """
+    return { (source, target): value for source, target, value in
+             performance_table.select("source", "target", statistic)
+                              .iter_rows() }
+
+def get_windowed_dfg_performance(
+    dataframe: pl.DataFrame | pl.LazyFrame,
+    every: str = "monthly",
+    period: str | None = None,
+    statistics: Iterable[str] = ("median", "count"),
+    parameters: dict[str | Parameters, Any] | None = None
+) -> pl.DataFrame:
+    """
+    Measure the performance statistics of the DFG edges on each time
+    window (by the timestamp of the source event) in a single
+    aggregation, to track the drift of the durations over time.
+
+    Parameters
+    ----------
+    dataframe
+        Log
+    every
+        The interval between the windows: monthly, quarterly, weekly,
+        yearly or a polars duration string (e.g. "2mo", "15d").
+        Default: monthly
+    period
+        The length of each window, with the same format of every. Longer
+        periods than every give rolling windows (e.g. every="monthly" and
+        period="quarterly"). Default: the same of every
+    statistics
+        The statistics to compute (see get_statistic_expr).
+        Default: median and count
+    parameters
+        The same parameters of apply_dfg_performance (the aggregation
+        measure is ignored)
+
+    Returns
+    -------
+    performance_table
+        DataFrame with the source, target and window (start datetime)
+        columns and one column per statistic, in seconds
+    """
+    if parameters is None: parameters = {}
+    activity_key = exec_utils.get_param_value(
+        Parameters.ACTIVITY_KEY, parameters, xes_util.DEFAULT_NAME_KEY)
+    timestamp_key = exec_utils.get_param_value(Parameters.TIMESTAMP_KEY,
+                             parameters, xes_util.DEFAULT_TIMESTAMP_KEY)
+    every = WINDOW_INTERVALS.get(every, every)
+    period = WINDOW_INTERVALS.get(period, period)
+
+    return (get_successive_rows(dataframe, parameters, True)
+        .sort(timestamp_key)
+        .group_by_dynamic(timestamp_key, every=every, period=period,
+                          group_by=[activity_key, "next_activity"])
+        .agg([get_statistic_expr(statistic) for statistic in statistics])
+        .rename({ activity_key: "source", "next_activity": "target",
+                  timestamp_key: "window" })
+        .sort("source", "target", "window")
+        .collect())
+
+def get_dfg_frequency_and_performance(
+    dataframe: pl.DataFrame | pl.LazyFrame,
+    percentage: float = 0.1,
+    statistics: Iterable[str] = ("median",),
+    parameters: dict[str | Parameters, Any] | None = None
+) -> tuple[tuple[Counter, Counter, Counter], pl.DataFrame | None]:
+    """
+    Compute the start, middle and end frequencies of the DFG edges (as
+    partition_dataframe_into_dfgs) and the performance table of the edges
+    from the successive events, collected once (the log is sorted and
+    shifted a single time) and aggregated twice. As apply_dfg_performance,
+    the durations are truncated to integer seconds unless they are
+    measured in business time.
+
+    Parameters
+    ----------
+    dataframe
+        Log
+    percentage
+        Percentage of the traces to be considered as start and end.
+        Default: 0.1
+    statistics
+        The performance statistics (see get_statistic_expr). If empty,
+        only the frequencies are computed. Default: median
+    parameters
+        The same parameters of apply_dfg_performance, where the filter
+        key and value are applied only to the performance
+
+    Returns
+    -------
+    tuple[tuple[Counter, Counter, Counter], pl.DataFrame | None]
+        The start, middle and end frequencies of the edges and the
+        performance table (see get_dfg_performance_table, with integer
+        seconds out of business time)
+    """
+    if parameters is None: parameters = {}
+    statistics = list(statistics)
+    activity_key = exec_utils.get_param_value(
+        Parameters.ACTIVITY_KEY, parameters, xes_util.DEFAULT_NAME_KEY)
+    filter_key = exec_utils.get_param_value(Parameters.FILTER_KEY,
+                                            parameters, None)
+    filter_value = exec_utils.get_param_value(Parameters.FILTER_VALUE,
+                                              parameters, None)
+
+    business_hours = exec_utils.get_param_value(
+        Parameters.BUSINESS_HOURS, parameters, False)
+    business_calendar = exec_utils.get_param_value(
+        Parameters.BUSINESS_CALENDAR, parameters, None)
+
+    # collect_all would run the sort and shift of each plan separately
+    successive_rows = get_successive_rows(dataframe, parameters, True,
+        percentage, apply_filter=False).collect().lazy()
+    plans = [successive_rows
+        .group_by("segment", activity_key, "next_activity",
+                  maintain_order=True)
+        .agg(pl.len().alias("count"))]
+    if statistics:
+        if filter_key is not None and filter_value is not None:
+            successive_rows = successive_rows.filter(
+                pl.col(filter_key) == filter_value)
+        plans.append(successive_rows
+            .group_by(activity_key, "next_activity", maintain_order=True)
+            .agg([get_statistic_expr(statistic)
+                  for statistic in statistics])
+            .rename({ activity_key: "source", "next_activity": "target" }))
+        if not business_hours and business_calendar is None:
+            plans[-1] = plans[-1].with_columns(
+                pl.col([statistic for statistic in statistics
+                        if statistic != "count"]).cast(pl.Int64))
+
+    results = pl.collect_all(plans)
+    segments = { segment: Counter() for segment in ("start", "middle",
+                                                    "end") }
+    for segment, source, target, count in results[0].iter_rows():
+        segments[segment][(source, target)] = count
+
+    performance_table = results[1] if statistics else None
+    return ((segments["start"], segments["middle"], segments["end"]),
+            performance_table)
+
+def get_duration_bins(max_duration: float, bins_amount: int = 20
+                      ) -> list[float]:
+    """
+    Get log-scaled bin edges for durations in seconds: the first bin is
+    [0, 1) and the others grow geometrically until the max duration.
+
+    Parameters
+    ----------
+    max_duration
+        The largest duration, in seconds
+    bins_amount
+        The amount of bins. Default: 20
+
+    Returns
+    -------
+    bins
+        The bins_amount + 1 ascending edges of the bins
+    """
+    upper_bound = max(float(max_duration), 1.0) * (1 + 1e-9)
+    return [0.0] + np.geomspace(1.0, upper_bound,
+                                max(bins_amount, 1)).tolist()
+
+def get_dfg_duration_histograms(
+    dataframe: pl.DataFrame | pl.LazyFrame,
+    bins: int | list[float] = 20,
+    parameters: dict[str | Parameters, Any] | None = None
+) -> tuple[list[float], dict[tuple[str, str], list[int]]]:
+    """
+    Count the durations of each DFG edge by bins, so the distribution of
+    an edge has a fixed size regardless of its amount of occurrences.
+
+    Parameters
+    ----------
+    dataframe
+        Log
+    bins
+        The amount of log-scaled bins (see get_duration_bins) or the
+        ascending edges of the bins, in seconds. The durations out of the
+        bins are counted on the first or last bin. Default: 20
+    parameters
+        The same parameters of apply_dfg_performance (the aggregation
+        measure is ignored)
+
+    Returns
+    -------
+    tuple[list[float], dict[tuple[str, str], list[int]]]
+        The edges of the bins and the count of each bin of each edge
+    """
+    if parameters is None: parameters = {}
+    activity_key = exec_utils.get_param_value(
+        Parameters.ACTIVITY_KEY, parameters, xes_util.DEFAULT_NAME_KEY)
+
+    durations = (get_successive_rows(dataframe, parameters, True)
+        .select(activity_key, "next_activity", "duration")
+        .collect())
+    if isinstance(bins, int):
+        bins = get_duration_bins(durations.get_column("duration").max()
+                                 or 0, bins)
+    bins_amount = len(bins) - 1
+
+    counts = (durations.lazy()
+        .with_columns((pl.lit(pl.Series(bins, dtype=pl.Float64))
+                       .search_sorted(pl.col("duration"), side="right")
+                       .cast(pl.Int64) - 1)
+                      .clip(0, bins_amount - 1).alias("bin"))
+        .group_by(activity_key, "next_activity", "bin")
+        .agg(pl.len().alias("count"))
+        .collect())
+
+    histograms: dict[tuple[str, str], list[int]] = dict()
+    for source, target, index, count in counts.iter_rows():
+        edge = (source, target)
+        if edge not in histograms:
+            histograms[edge] = [0] * bins_amount
+        histograms[edge][index] = count
+    return list(bins), histograms
+
+def get_dfg_duration_sketches(
+    dataframes: pl.DataFrame | pl.LazyFrame
+                | Iterable[pl.DataFrame | pl.LazyFrame],
+    parameters: dict[str | Parameters, Any] | None = None,
+    sketches: dict[tuple[str, str], TDigest] | None = None
+) -> dict[tuple[str, str], TDigest]:
+    """
+    Summarize the durations of each DFG edge by a mergeable quantile
+    sketch (TDigest), streaming the log shard by shard, so only the
+    durations of one shard are in memory at a time.
+
+    Parameters
+    ----------
+    dataframes
+        Log or iterable of logs (e.g. units or periods), where each one
+        must contain the whole cases
+    parameters
+        The same parameters of apply_dfg_performance, and:
+        - Parameters.SKETCH_COMPRESSION => the compression of the
+            sketches, bounding the centroids of each edge. Default: 200
+        - Parameters.SHARDS_AMOUNT => the amount of shards each log is
+            split into by the hash of the case. Default: 1
+    sketches
+        Sketches of previous logs to be updated. Default: None
+
+    Returns
+    -------
+    sketches
+        The TDigest of the durations (in seconds) of each edge
+    """
+    if parameters is None: parameters = {}
+    if sketches is None: sketches = dict()
+    if isinstance(dataframes, (pl.DataFrame, pl.LazyFrame)):
+        dataframes = [dataframes]
+
+    case_key = exec_utils.get_param_value(
+        Parameters.CASE_KEY, parameters, CASE_CONCEPT_NAME)
+    activity_key = exec_utils.get_param_value(
+        Parameters.ACTIVITY_KEY, parameters, xes_util.DEFAULT_NAME_KEY)
+    compression = exec_utils.get_param_value(
+        Parameters.SKETCH_COMPRESSION, parameters, 200)
+    shards_amount = exec_utils.get_param_value(
+        Parameters.SHARDS_AMOUNT, parameters, 1)
+
+    for dataframe in dataframes:
+        for shard in range(shards_amount):
+            events = dataframe.lazy()
+            if shards_amount > 1:
+                events = events.filter(
+                    pl.col(case_key).hash() % shards_amount == shard)
+            durations = (get_successive_rows(events, parameters, True)
+                .select(activity_key, "next_activity", "duration")
+                .sort(activity_key, "next_activity")
+                .collect())
+            if durations.height == 0:
+                continue
+
+            edge_ids = (durations.select(pl.struct(
+                activity_key, "next_activity").rle_id())
+                .to_series().to_numpy())
+            starts = np.flatnonzero(np.diff(edge_ids, prepend=-1))
+            ends = np.append(starts[1:], len(edge_ids))
+            values = durations.get_column("duration").to_numpy()
+            sources = durations.get_column(activity_key).gather(starts)
+            targets = durations.get_column("next_activity").gather(starts)
+            for source, target, start, end in zip(sources, targets,
+                                                  starts, ends):
+                edge = (source, target)
+                if edge not in sketches:
+                    sketches[edge] = TDigest(compression)
+                sketches[edge].update(values[start:end])
+
+    return sketches
+
+def apply_dfg_performance(
+    dataframe: pl.DataFrame,
+    parameters: dict[str | Parameters, Any] | None = None
+) -> dfg_type:
+    """
+    Measure performance between couples of attributes in the DFG graph
+
+    Parameters
+    ----------
+    log
+        Log
+    parameters
+        Possible parameters passed to the algorithms:
+            aggregationMeasure -> performance aggregation measure (min, 
+                max, mean, median, sum, all, stdev, raw_values, sketch,
+                histogram). The sketch measure returns the TDigest of each
+                edge (see get_dfg_duration_sketches) and the histogram
+                measure the count of each bin of the edge durations (see
+                get_dfg_duration_histograms). Default: mean
+            case_key -> Attribute to use as case
+            activity_key -> Attribute to use as activity
+            timestamp_key -> Attribute to use as timestamp
+            start_timestamp_key -> Attribute to use as start timestamp
+        - Parameters.BUSINESS_HOURS => calculates the difference of time
+            based on the business hours, not the total time, with
+            vectorized week arithmetic over the hour slots. Default: False
+        - Parameters.WORKTIMING => work schedule of the company (provided
+            as a list where the first number is the start of the work
+            time, and the second number is the end of the work time), if
+            business hours are enabled Default: [7, 17] (work shift from
+            07:00 to 17:00)
+        - Parameters.WEEKENDS => indexes of the days of the week that are 
+            weekend Default: [6, 7] (weekends are Saturday and Sunday)
+        - Parameters.BUSINESS_CALENDAR => a BusinessCalendar (with the
+            holidays and recess periods) used to calculate the difference
+            of time, instead of the worktiming and weekends. Default: None
+        - Parameters.FILTER_KEY => attribute to filter by
+        - Parameters.FILTER_VALUE => value to filter by
+        - Parameters.HISTOGRAM_BINS => the amount or the edges of the bins
+            of the histogram measure. Default: 20
+
+    Returns
+    -------
+    dfg
+        DFG graph
+    """
+    if parameters is None: parameters = {}
+
+    activity_key = exec_utils.get_param_value(
+        Parameters.ACTIVITY_KEY, parameters, xes_util.DEFAULT_NAME_KEY)
+    aggregation_measure = exec_utils.get_param_value(
+        Parameters.AGGREGATION_MEASURE, parameters, "mean")
+    business_hours = exec_utils.get_param_value(
+        Parameters.BUSINESS_HOURS, parameters, False)
+    business_hours = business_hours or exec_utils.get_param_value(
+        Parameters.BUSINESS_CALENDAR, parameters, None) is not None
+
+    if aggregation_measure == "sketch":
+        return get_dfg_duration_sketches(dataframe, parameters)
+    if aggregation_measure == "histogram":
+        bins = exec_utils.get_param_value(Parameters.HISTOGRAM_BINS,
+                                          parameters, 20)
+        return get_dfg_duration_histograms(dataframe, bins, parameters)[1]
+
+    df_successive_rows = get_successive_rows(dataframe, parameters)
     dfg_performance = df_successive_rows.group_by(
         [activity_key, "next_activity"]
     )
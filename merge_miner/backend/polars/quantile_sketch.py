@@ -0,0 +1,119 @@
+from typing import Iterable
+import numpy as np
+
+class TDigest:
+    """
+    Mergeable quantile sketch (merging t-digest with the arcsine scale
+    function), where the values are summarized by at most about
+    compression / 2 weighted centroids. The error of the quantiles is
+    smaller on the tails and the memory is bounded independently of the
+    amount of values, so the sketches of the shards, units or days can be
+    serialized and merged later.
+    """
+    def __init__(self, compression: float = 200):
+        self.compression = compression
+        self.means = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self.min = np.inf
+        self.max = -np.inf
+
+    def __len__(self) -> int:
+        return len(self.means)
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def _scale(self, q: np.ndarray) -> np.ndarray:
+        return self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        cumulative = np.cumsum(weights)
+        total = cumulative[-1]
+        # every centroid spans at most one unit of the scale function
+        q_before = (cumulative - weights) / total
+        clusters = np.floor(self._scale(q_before) + self.compression / 4)
+        starts = np.flatnonzero(np.diff(clusters, prepend=-np.inf))
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def update(self, values: Iterable[float] | np.ndarray) -> "TDigest":
+        """Add a batch of values (e.g. the durations of a chunk)."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress(np.concatenate((self.means, values)),
+                       np.concatenate((self.weights, np.ones(len(values)))))
+        return self
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        """Merge the centroids of other sketch into this one."""
+        if len(other) == 0:
+            return self
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(np.concatenate((self.means, other.means)),
+                       np.concatenate((self.weights, other.weights)))
+        return self
+
+    @classmethod
+    def merge_all(cls, digests: Iterable["TDigest"],
+                  compression: float = 200) -> "TDigest":
+        merged = cls(compression)
+        for digest in digests:
+            merged.merge(digest)
+        return merged
+
+    def quantile(self, q: float | Iterable[float]) -> float | np.ndarray:
+        """
+        Estimate the quantile(s), interpolating between the centroids and
+        the exact minimum and maximum. Returns nan when it's empty.
+        """
+        scalar = np.isscalar(q)
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        if len(self) == 0:
+            result = np.full(len(q), np.nan)
+        else:
+            total = self.weights.sum()
+            centers = np.cumsum(self.weights) - self.weights / 2
+            positions = np.concatenate(([0], centers, [total]))
+            values = np.concatenate(([self.min], self.means, [self.max]))
+            result = np.interp(np.clip(q, 0, 1) * total, positions, values)
+        return float(result[0]) if scalar else result
+
+    def to_dict(self) -> dict[str, float | list[float]]:
+        return {
+            "compression": self.compression,
+            "min": self.min, "max": self.max,
+            "means": self.means.tolist(),
+            "weights": self.weights.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, float | list[float]]) -> "TDigest":
+        digest = cls(data["compression"])
+        digest.min, digest.max = data["min"], data["max"]
+        digest.means = np.asarray(data["means"], dtype=np.float64)
+        digest.weights = np.asarray(data["weights"], dtype=np.float64)
+        return digest
+
+    def to_bytes(self) -> bytes:
+        """Compact binary form: the header followed by the centroids."""
+        header = np.array([self.compression, self.min, self.max],
+                          dtype=np.float64)
+        return np.concatenate((header, self.means, self.weights)).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TDigest":
+        values = np.frombuffer(data, dtype=np.float64)
+        digest = cls(float(values[0]))
+        digest.min, digest.max = float(values[1]), float(values[2])
+        centroids = (len(values) - 3) // 2
+        digest.means = values[3:3 + centroids].copy()
+        digest.weights = values[3 + centroids:].copy()
+        return digest
@@ -0,0 +1,138 @@
+import polars as pl
+from typing import Any, Iterable
+
+from pm4py.util import exec_utils
+from ..constants import CASE_CONCEPT_NAME, START_TIMESTAMP_NAME
+from pm4py.util import xes_constants as xes_util
+from .performance import Parameters, WINDOW_INTERVALS
+
+WIP_LEVELS = ("case", "activity")
+
+def get_wip_deltas(
+    dataframe: pl.DataFrame | pl.LazyFrame,
+    level: str = "case",
+    group_keys: Iterable[str] = (),
+    parameters: dict[str | Parameters, Any] | None = None
+) -> pl.LazyFrame:
+    """
+    Get the +1 (start) and -1 (end) events of the sweep line, summed by
+    instant. On the case level each case (of each group) is open from its
+    first start to its last end, and on the activity level each event is
+    active from its start to its end.
+
+    Parameters
+    ----------
+    dataframe
+        Log with the start and end timestamps
+    level
+        "case" or "activity". Default: case
+    group_keys
+        The columns that group the curves, e.g. [USER_KEY].
+        Default: a single curve
+    parameters
+        The keys parameters of apply_dfg_performance (the start timestamp
+        key defaults to START_TIMESTAMP_NAME)
+
+    Returns
+    -------
+    deltas
+        LazyFrame with the group keys, time and delta columns
+    """
+    if level not in WIP_LEVELS:
+        raise ValueError(f"{level} is not a valid WIP level!")
+    if parameters is None: parameters = {}
+    group_keys = list(group_keys)
+
+    case_key = exec_utils.get_param_value(
+        Parameters.CASE_KEY, parameters, CASE_CONCEPT_NAME)
+    start_timestamp_key = exec_utils.get_param_value(
+        Parameters.START_TIMESTAMP_KEY, parameters, START_TIMESTAMP_NAME)
+    timestamp_key = exec_utils.get_param_value(Parameters.TIMESTAMP_KEY,
+                             parameters, xes_util.DEFAULT_TIMESTAMP_KEY)
+
+    intervals = dataframe.lazy().select(
+        *group_keys, case_key,
+        pl.col(start_timestamp_key).alias("start"),
+        pl.col(timestamp_key).alias("end"))
+    if level == "case":
+        intervals = intervals.group_by(*group_keys, case_key).agg(
+            pl.col("start").min(), pl.col("end").max())
+
+    return (pl.concat([
+            intervals.select(*group_keys, pl.col("start").alias("time"),
+                             pl.lit(1, dtype=pl.Int64).alias("delta")),
+            intervals.select(*group_keys, pl.col("end").alias("time"),
+                             pl.lit(-1, dtype=pl.Int64).alias("delta")),
+        ])
+        .group_by(*group_keys, "time")
+        .agg(pl.col("delta").sum()))
+
+def get_wip_curve(
+    dataframe: pl.DataFrame | pl.LazyFrame,
+    level: str = "case",
+    group_keys: Iterable[str] = (),
+    every: str | None = None,
+    parameters: dict[str | Parameters, Any] | None = None
+) -> pl.DataFrame:
+    """
+    Compute the work in progress (open cases or active movements) over
+    time with a sweep line: the +1/-1 events are sorted and summed
+    cumulatively, without loops over the cases.
+
+    Parameters
+    ----------
+    dataframe
+        Log with the start and end timestamps
+    level
+        "case" (open cases) or "activity" (active movements).
+        Default: case
+    group_keys
+        The columns that group the curves, e.g. [USER_KEY] or the unit.
+        Default: a single curve
+    every
+        If specified, downsample the curve to one point per interval
+        (weekly, monthly, quarterly, yearly or a polars duration string
+        as "1d"), with the WIP at the end and the peak of the interval,
+        including the intervals without changes. Default: None
+    parameters
+        The parameters of get_wip_deltas
+
+    Returns
+    -------
+    wip
+        DataFrame with the group keys, time and wip columns (and max_wip
+        when downsampled), sorted by the group keys and time
+    """
+    group_keys = list(group_keys)
+    curve = (get_wip_deltas(dataframe, level, group_keys, parameters)
+        .sort(*group_keys, "time")
+        .with_columns((pl.col("delta").cum_sum().over(group_keys)
+                       if group_keys else pl.col("delta").cum_sum())
+                      .alias("wip"))
+        .drop("delta"))
+    if every is None:
+        return curve.collect()
+
+    every = WINDOW_INTERVALS.get(every, every)
+    downsampled = (curve
+        .group_by_dynamic("time", every=every,
+                          group_by=group_keys or None)
+        .agg(pl.col("wip").last(), pl.col("wip").max().alias("max_wip"))
+        .collect()
+        .sort("time")
+        .upsample("time", every=every, group_by=group_keys or None,
+                  maintain_order=True))
+    # the upsampled rows follow the rows of their group, so the keys are
+    # filled forward, and the intervals without changes keep the WIP
+    downsampled = downsampled.with_columns(
+        pl.col(group_keys).forward_fill()).with_columns(
+        pl.col("wip").forward_fill().over(group_keys) if group_keys
+        else pl.col("wip").forward_fill())
+    # the peak of the interval includes the WIP carried from the previous
+    # one (the changes of the interval may only decrease it)
+    carried_wip = (pl.col("wip").shift(1).over(group_keys) if group_keys
+                   else pl.col("wip").shift(1))
+    return downsampled.with_columns(
+        pl.max_horizontal("max_wip", carried_wip).fill_null(pl.col("wip"))
+          .alias("max_wip")
+    ).sort(*group_keys, "time")
@@ -2,4 +2,5 @@ from .flowchart_feat import get_dfg_backbone
 from .statistics import show_activities, show_dfgs_tb, show_dfg_table
 from .preprocessing import add_activity_id, add_activity_sufix, filter_by_especialista
 from .islands import (add_edge_to_islands,filter_by_larger_island,
-                      search_for_island,get_edges_to_merge_islands)
\ No newline at end of file
+                      search_for_island,get_edges_to_merge_islands,
+                      get_edges_to_merge_dfg_islands)
\ No newline at end of file
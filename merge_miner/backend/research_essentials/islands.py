@@ -1,3 +1,5 @@
+from ..sparse_dfg import SparseDFG
+from typing import Iterable
 from functools import reduce
 from ..types import dfg_type
 
@@ -113,24 +115,126 @@ def get_edges_to_merge_islands(islands: list[set[str]],
 
     return edges_to_merge
 
-def filter_by_larger_island(dfg: dfg_type) -> dfg_type:
+def get_edges_to_merge_dfg_islands(dfg: dfg_type | SparseDFG,
+                                   all_edges: dfg_type) -> dfg_type:
     """
-    Group the dfg edges and return the largest group.
+    Get the edges to merge the islands of the dfg, as in
+    get_edges_to_merge_islands, but labeling the islands with the sparse
+    representation of the dfg and merging them with an union-find, so it
+    doesn't degrade with thousands of activities.
+
+    Parameters
+    ------------
+    dfg
+        The Directly-Follows Graph with the islands
+    all_edges
+        The edges not in the islands, in the order to be tried
+
+    Returns
+    ------------
+    The edges to merge the islands
+    """
+    if not isinstance(dfg, SparseDFG):
+        dfg = SparseDFG.from_dfg({ edge: 1 for edge in dfg })
+    islands_amount, labels = dfg.component_labels()
+    parents = list(range(islands_amount))
+
+    def find(island: int) -> int:
+        while parents[island] != island:
+            parents[island] = parents[parents[island]]
+            island = parents[island]
+        return island
+
+    edges_to_merge: dfg_type = dict()
+    for (a, b), value in all_edges.items():
+        if islands_amount <= 1:
+            break
+
+        index_a = dfg.activity_index.get(a)
+        index_b = dfg.activity_index.get(b)
+        if index_a is None or index_b is None:
+            continue
+        if labels[index_a] < 0 or labels[index_b] < 0:
+            continue
+
+        island_a, island_b = find(labels[index_a]), find(labels[index_b])
+        if island_a == island_b:
+            continue
+
+        parents[island_b] = island_a
+        islands_amount -= 1
+        edges_to_merge[(a, b)] = value
+
+    return edges_to_merge
+
+def get_larger_island(edges: Iterable[tuple[str, str]]) -> set[str]:
+    """
+    Get the activities of the largest island of the edges. The islands are
+    grouped in the order of the edges as in add_edge_to_islands (a merged
+    island takes the place of the island of the first activity), so in
+    ties the first island of that order is kept, but with an union-find
+    instead of the scans of the list of islands.
+
+    Parameters
+    ------------
+    edges
+        The edges, in the order they were added
+
+    Returns
+    ------------
+    The activities of the largest island
+    """
+    parents: dict[str, str] = dict()
+    sizes: dict[str, int] = dict()
+    orders: dict[str, int] = dict()
+
+    def find(activity: str) -> str:
+        while parents[activity] != activity:
+            parents[activity] = parents[parents[activity]]
+            activity = parents[activity]
+        return activity
+
+    for a, b in edges:
+        if a not in parents and b not in parents:
+            parents[a], parents[b] = a, a
+            sizes[a], orders[a] = len({ a, b }), len(parents)
+        elif b not in parents:
+            parents[b] = find(a)
+            sizes[parents[b]] += 1
+        elif a not in parents:
+            parents[a] = find(b)
+            sizes[parents[a]] += 1
+        else:
+            island_a, island_b = find(a), find(b)
+            if island_a != island_b:
+                parents[island_b] = island_a
+                sizes[island_a] += sizes.pop(island_b)
+                orders.pop(island_b)
+
+    if not orders:
+        return set()
+    larger_island = min(orders, key=lambda island: (-sizes[island],
+                                                    orders[island]))
+    return { activity for activity in parents
+             if find(activity) == larger_island }
+
+def filter_by_larger_island(dfg: dfg_type,
+                            edges: Iterable[tuple[str, str]] | None = None
+                            ) -> dfg_type:
+    """
+    Group the dfg edges and return the largest group. In ties the first
+    island, in the order of the edges, is kept (see get_larger_island).
 
     Args:
         dfg (dfg_type): Directly-Follows Graph
+        edges (Iterable[tuple[str, str]], optional): The edges in the
+            order they were added, if it isn't the order of the dfg (e.g.
+            with the edges that merged its islands at the end). Defaults
+            to None.
 
     Returns:
         dfg_type: Filtered Directly-Follows Graph
     """
-    islands = list()
-    for edge in dfg:
-        islands = add_edge_to_islands(islands, edge)
-    islands_to_remove = sorted(islands, reverse=True,
-                                key=lambda x: len(x))[1:]
-    activities_to_remove = reduce(lambda x, y: x.union(y),
-                                  islands_to_remove, set())
-
+    larger_island = get_larger_island(dfg if edges is None else edges)
     return { (act1, act2): value for (act1, act2), value in dfg.items()
-             if act1 not in activities_to_remove
-             and act2 not in activities_to_remove}
+             if act1 in larger_island and act2 in larger_island }
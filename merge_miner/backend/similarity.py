@@ -0,0 +1,272 @@
+from .constants import CASE_CONCEPT_NAME, ACTIVITY_NAME, TIMESTAMP_NAME
+from scipy.cluster.hierarchy import linkage, fcluster
+from scipy.spatial.distance import squareform
+from .types import dfg_type, unit_source_type
+from .comparison import load_unit_source
+from scipy.sparse import csr_matrix
+from typing import Iterable
+import polars as pl
+import numpy as np
+
+SIMILARITY_METRICS = ("cosine", "jaccard", "weighted")
+
+def get_unit_edge_frequencies(event_log: pl.DataFrame) -> dfg_type:
+    """
+    Get the Directly-Follows Graph of a unit where the values are the
+    percentage of the cases with the edge, the same normalization used
+    by the comparison of the units.
+
+    Parameters
+    ------------
+    event_log
+        EventLog dataframe
+
+    Returns
+    ------------
+    dfg_type: The normalized dfg of the unit
+    """
+    case_amount = event_log.get_column(CASE_CONCEPT_NAME).n_unique()
+    if case_amount == 0:
+        return dict()
+
+    edges = (event_log.lazy()
+        .select(CASE_CONCEPT_NAME, ACTIVITY_NAME, TIMESTAMP_NAME)
+        .sort([CASE_CONCEPT_NAME, TIMESTAMP_NAME])
+        .with_columns(pl.col(ACTIVITY_NAME).shift(-1)
+                        .over(CASE_CONCEPT_NAME).alias("next_activity"))
+        .drop_nulls("next_activity")
+        .unique([CASE_CONCEPT_NAME, ACTIVITY_NAME, "next_activity"])
+        .group_by(ACTIVITY_NAME, "next_activity")
+        .agg(pl.len().alias("count"))
+        .collect())
+
+    return { (a, b): count / case_amount * 100 for a, b, count
+             in edges.iter_rows() }
+
+def build_units_edge_matrix(dataframes: Iterable[unit_source_type]
+                            ) -> tuple[csr_matrix, list[tuple[str, str]]]:
+    """
+    Build the normalized edge vector of each unit once, as the rows of a
+    sparse matrix over an edge index shared by all the units. The units
+    are streamed, so only one of them is loaded at a time.
+
+    Parameters
+    ------------
+    dataframes
+        Iterable of unit sources (see load_unit_source)
+
+    Returns
+    ------------
+    tuple[csr_matrix, list[tuple[str, str]]]: The units x edges matrix and
+    the edge of each column
+    """
+    edge_index: dict[tuple[str, str], int] = dict()
+    rows, columns, values = list(), list(), list()
+    units_amount = 0
+    for unit, source in enumerate(dataframes):
+        frequencies = get_unit_edge_frequencies(load_unit_source(source))
+        for edge, frequency in frequencies.items():
+            if edge not in edge_index:
+                edge_index[edge] = len(edge_index)
+            rows.append(unit)
+            columns.append(edge_index[edge])
+            values.append(frequency)
+        units_amount = unit + 1
+
+    matrix = csr_matrix((np.array(values, dtype=np.float64),
+                         (np.array(rows, dtype=np.int64),
+                          np.array(columns, dtype=np.int64))),
+                        shape=(units_amount, len(edge_index)))
+    return matrix, list(edge_index.keys())
+
+def get_thresholded_edges(matrix: csr_matrix, threshold: float=0.5
+                          ) -> csr_matrix:
+    """
+    Binarize the units x edges matrix, where an edge is present in a unit
+    when its value is greater than the maximum value of the edge between
+    the units times the threshold (as in aggregate_by_threshold).
+
+    Parameters
+    ------------
+    matrix
+        The units x edges matrix
+    threshold
+        The threshold to consider a valid relation comparing to the max
+        occurrences between the units. Defaults to 0.5.
+
+    Returns
+    ------------
+    csr_matrix: The binary units x edges matrix
+    """
+    max_values = matrix.max(axis=0).toarray().ravel()
+    present = matrix.copy()
+    present.data = (present.data >= max_values[present.indices] * threshold
+                    ).astype(np.float64)
+    present.eliminate_zeros()
+    return present
+
+def cosine_similarity(matrix: csr_matrix) -> np.ndarray:
+    """
+    Compute the cosine similarity between every pair of units.
+
+    Parameters
+    ------------
+    matrix
+        The units x edges matrix
+
+    Returns
+    ------------
+    np.ndarray: The units x units similarity matrix
+    """
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    products = (matrix @ matrix.T).toarray()
+    return products / norms[:, None] / norms[None, :]
+
+def jaccard_similarity(matrix: csr_matrix, threshold: float=0.5
+                       ) -> np.ndarray:
+    """
+    Compute the Jaccard similarity between the thresholded edges of every
+    pair of units.
+
+    Parameters
+    ------------
+    matrix
+        The units x edges matrix
+    threshold
+        The threshold used to binarize the edges. Defaults to 0.5.
+
+    Returns
+    ------------
+    np.ndarray: The units x units similarity matrix
+    """
+    present = get_thresholded_edges(matrix, threshold)
+    intersection = (present @ present.T).toarray()
+    sizes = np.diag(intersection)
+    union = sizes[:, None] + sizes[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection),
+                     where=union > 0)
+
+def weighted_overlap_similarity(matrix: csr_matrix) -> np.ndarray:
+    """
+    Compute the weighted overlap (the sum of the minimum values over the
+    sum of the maximum values of the edges) between every pair of units.
+    Only the non-zero values of the columns of the edges of each unit are
+    visited, without a dense copy of the matrix.
+
+    Parameters
+    ------------
+    matrix
+        The units x edges matrix
+
+    Returns
+    ------------
+    np.ndarray: The units x units similarity matrix
+    """
+    matrix = csr_matrix(matrix)
+    units_amount = matrix.shape[0]
+    columns_matrix = matrix.tocsc()
+    totals = np.asarray(matrix.sum(axis=1)).ravel()
+    minimums = np.zeros((units_amount, units_amount))
+    for unit in range(units_amount):
+        start, end = matrix.indptr[unit], matrix.indptr[unit + 1]
+        columns, values = matrix.indices[start:end], matrix.data[start:end]
+        # the other units on the edges of the unit, as (row, column) pairs
+        edges = columns_matrix[:, columns].tocoo()
+        minimums[unit] = np.bincount(edges.row,
+            weights=np.minimum(edges.data, values[edges.col]),
+            minlength=units_amount)
+
+    maximums = totals[:, None] + totals[None, :] - minimums
+    return np.divide(minimums, maximums, out=np.zeros_like(minimums),
+                     where=maximums > 0)
+
+def get_units_similarity(dataframes: Iterable[unit_source_type] | csr_matrix,
+                         metrics: Iterable[str] = SIMILARITY_METRICS,
+                         threshold: float=0.5) -> dict[str, np.ndarray]:
+    """
+    Compute the units x units similarity matrices of the process of each
+    unit, building the normalized edge vectors only once.
+
+    Parameters
+    ------------
+    dataframes
+        Iterable of unit sources (see load_unit_source) or the units x
+        edges matrix already built by build_units_edge_matrix
+    metrics
+        The similarity metrics to compute: "cosine", "jaccard" (on the
+        thresholded edges) and "weighted" (weighted overlap).
+        Defaults to all of them.
+    threshold
+        The threshold used to binarize the edges on the jaccard
+        similarity. Defaults to 0.5.
+
+    Returns
+    ------------
+    dict[str, np.ndarray]: The similarity matrix of each metric, where the
+    rows and columns follow the order of the units
+    """
+    matrix = dataframes
+    if not isinstance(matrix, csr_matrix):
+        matrix, _ = build_units_edge_matrix(dataframes)
+
+    similarities: dict[str, np.ndarray] = dict()
+    for metric in metrics:
+        if metric == "cosine":
+            similarities[metric] = cosine_similarity(matrix)
+        elif metric == "jaccard":
+            similarities[metric] = jaccard_similarity(matrix, threshold)
+        elif metric == "weighted":
+            similarities[metric] = weighted_overlap_similarity(matrix)
+        else:
+            raise ValueError(f"{metric} is not a valid similarity metric!")
+    return similarities
+
+def rank_similar_units(similarity: np.ndarray, unit: int,
+                       top: int | None = None) -> list[tuple[int, float]]:
+    """
+    Rank the other units by their similarity to the specified unit.
+
+    Parameters
+    ------------
+    similarity
+        The units x units similarity matrix
+    unit
+        The index of the reference unit
+    top
+        The maximum number of units to return. Defaults to all units.
+
+    Returns
+    ------------
+    list[tuple[int, float]]: The index and similarity of the units, from
+    the most to the least similar
+    """
+    scores = similarity[unit]
+    ranking = [other for other in np.argsort(-scores, kind="stable")
+               if other != unit]
+    return [(int(other), float(scores[other])) for other in ranking[:top]]
+
+def cluster_units(similarity: np.ndarray, clusters_amount: int,
+                  method: str="average") -> np.ndarray:
+    """
+    Cluster the units by the hierarchical clustering of their similarity.
+
+    Parameters
+    ------------
+    similarity
+        The units x units similarity matrix
+    clusters_amount
+        The maximum number of clusters
+    method
+        The linkage method of the hierarchical clustering.
+        Defaults to "average".
+
+    Returns
+    ------------
+    np.ndarray: The cluster label (starting at 1) of each unit
+    """
+    distances = np.clip(1 - similarity, 0, None)
+    np.fill_diagonal(distances, 0)
+    condensed = squareform((distances + distances.T) / 2, checks=False)
+    return fcluster(linkage(condensed, method=method), clusters_amount,
+                    criterion="maxclust")
@@ -0,0 +1,147 @@
+from .constants import CASE_CONCEPT_NAME, ACTIVITY_NAME, TIMESTAMP_NAME
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse import csr_matrix
+from collections import Counter
+from typing import Iterable
+from .types import dfg_type
+import polars as pl
+import numpy as np
+
+class SparseDFG:
+    """
+    Directly-Follows Graph stored as a CSR adjacency matrix over the
+    encoded activities, where the rows are the source activities and the
+    columns are the target activities. It's meant for large activity
+    alphabets (e.g. activities with the id and suffixes), where the
+    dict-of-tuples dfgs and the list-of-sets islands degrade.
+    """
+    def __init__(self, matrix: csr_matrix, activities: list[str]):
+        self.matrix = csr_matrix(matrix)
+        self.matrix.eliminate_zeros()
+        self.activities = list(activities)
+        self.activity_index = { act: index for index, act
+                                in enumerate(self.activities) }
+
+    @staticmethod
+    def get_activity_index(activities: Iterable[str]) -> dict[str, int]:
+        index: dict[str, int] = dict()
+        for act in activities:
+            if act not in index:
+                index[act] = len(index)
+        return index
+
+    @classmethod
+    def from_dfg(cls, dfg: dfg_type, activities: list[str] | None = None
+                 ) -> "SparseDFG":
+        """
+        Encode a dict-of-tuples dfg. The activities are encoded by the order
+        of appearance in the dfg, unless the list of activities is specified.
+        """
+        if activities is None:
+            activities = list(cls.get_activity_index(
+                act for edge in dfg for act in edge))
+        index = { act: i for i, act in enumerate(activities) }
+        sources = np.fromiter((index[a] for a, _ in dfg), dtype=np.int64,
+                              count=len(dfg))
+        targets = np.fromiter((index[b] for _, b in dfg), dtype=np.int64,
+                              count=len(dfg))
+        values = np.array(list(dfg.values()))
+        matrix = csr_matrix((values, (sources, targets)),
+                            shape=(len(activities), len(activities)))
+        return cls(matrix, activities)
+
+    @classmethod
+    def from_edges(cls, edges: Iterable[tuple[str, str]]) -> "SparseDFG":
+        """
+        Count the occurrences of each edge, e.g. the edges returned by
+        partition_dataframe_into_dfgs.
+        """
+        return cls.from_dfg(Counter(edges))
+
+    @classmethod
+    def from_eventlog(cls, event_log: pl.DataFrame,
+                      activity_key: str = ACTIVITY_NAME) -> "SparseDFG":
+        """
+        Count the directly-follows relations of the eventlog, encoding the
+        activities and the successors without python loops.
+        """
+        activities = (event_log.get_column(activity_key).unique()
+                               .sort().to_list())
+        codes = (event_log.lazy()
+            .select(CASE_CONCEPT_NAME, TIMESTAMP_NAME, activity_key)
+            .sort([CASE_CONCEPT_NAME, TIMESTAMP_NAME])
+            .with_columns((pl.col(activity_key).rank("dense") - 1)
+                          .cast(pl.Int64).alias("source"))
+            .with_columns(pl.col("source").shift(-1).over(CASE_CONCEPT_NAME)
+                          .alias("target"))
+            .drop_nulls("target")
+            .select("source", "target")
+            .collect())
+
+        sources = codes.get_column("source").to_numpy()
+        targets = codes.get_column("target").to_numpy()
+        matrix = csr_matrix((np.ones(len(sources), dtype=np.int64),
+                             (sources, targets)),
+                            shape=(len(activities), len(activities)))
+        return cls(matrix, activities)
+
+    def __len__(self) -> int:
+        return self.matrix.nnz
+
+    def to_dfg(self) -> dfg_type:
+        coo = self.matrix.tocoo()
+        return { (self.activities[a], self.activities[b]): value.item()
+                 for a, b, value in zip(coo.row, coo.col, coo.data) }
+
+    def out_frequency(self) -> np.ndarray:
+        """Sum of the outgoing values of each activity (row sums)."""
+        return np.asarray(self.matrix.sum(axis=1)).ravel()
+
+    def in_frequency(self) -> np.ndarray:
+        """Sum of the incoming values of each activity (column sums)."""
+        return np.asarray(self.matrix.sum(axis=0)).ravel()
+
+    def threshold(self, min_value: float) -> "SparseDFG":
+        """Keep only the edges with value greater or equal to min_value."""
+        matrix = self.matrix.copy()
+        matrix.data[matrix.data < min_value] = 0
+        return SparseDFG(matrix, self.activities)
+
+    def top_k(self, k: int) -> "SparseDFG":
+        """Keep only the k edges with the largest values."""
+        matrix = self.matrix.copy()
+        if k < matrix.nnz:
+            order = np.argsort(-matrix.data, kind="stable")
+            matrix.data[order[k:]] = 0
+        return SparseDFG(matrix, self.activities)
+
+    def component_labels(self) -> tuple[int, np.ndarray]:
+        """
+        Label the weakly connected components (islands) of the graph. The
+        activities without any edge receive the label -1.
+
+        Returns
+        ----------------
+        tuple[int, np.ndarray]: The number of islands and the island of
+        each activity
+        """
+        _, labels = connected_components(self.matrix, directed=True,
+                                         connection="weak")
+        has_edge = (self.out_frequency() != 0) | (self.in_frequency() != 0)
+        labels = np.where(has_edge, labels, -1)
+        _, labels = np.unique(labels, return_inverse=True)
+        labels = labels - (0 if has_edge.all() else 1)
+        return int(labels.max(initial=-1) + 1), labels
+
+    def largest_component(self) -> "SparseDFG":
+        """
+        Keep only the edges of the island with more activities, in ties the
+        island of the first encoded activity is kept.
+        """
+        amount, labels = self.component_labels()
+        if amount <= 1:
+            return self
+        sizes = np.bincount(labels[labels >= 0], minlength=amount)
+        kept = labels == int(np.argmax(sizes))
+        matrix = self.matrix.multiply(kept[:, None]).tocsr()
+        return SparseDFG(matrix, self.activities)
@@ -1 +1,6 @@
-dfg_type = dict[tuple[str, str], float | int]
\ No newline at end of file
+from typing import Callable
+import polars as pl
+
+dfg_type = dict[tuple[str, str], float | int]
+unit_source_type = (pl.DataFrame | pl.LazyFrame | str
+                    | Callable[[], pl.DataFrame])
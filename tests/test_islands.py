@@ -0,0 +1,49 @@
+from merge_miner.backend.research_essentials.islands import (
+    add_edge_to_islands, filter_by_larger_island)
+from merge_miner.backend.discover.dfg_discovery import frequency_dfg
+from datetime import datetime, timedelta
+import polars as pl
+import random
+
+def get_tied_log(islands: int = 3, size: int = 10, seed: int = 0,
+                 cases: int = 60) -> pl.DataFrame:
+    """Event log where the cases of each island only have its activities."""
+    rnd = random.Random(seed)
+    rows = list()
+    for island in range(islands):
+        activities = [f"A{island * size + i}" for i in range(size)]
+        for case in range(cases):
+            timestamp = datetime(2021, 1, 1) + timedelta(
+                hours=rnd.randint(0, 5000))
+            for activity in rnd.sample(activities, rnd.randint(2, size)):
+                timestamp += timedelta(minutes=rnd.randint(1, 500))
+                rows.append({ "case:concept:name": f"I{island}_{case}",
+                              "concept:name": activity,
+                              "time:timestamp": timestamp })
+    return pl.DataFrame(rows)
+
+def test_larger_island_ties_keep_the_list_order():
+    for seed in range(30):
+        rnd = random.Random(seed)
+        dfg = dict()
+        for _ in range(40):
+            island = rnd.randint(0, 5)
+            dfg[(f"B{island}{rnd.randint(0, 3)}",
+                 f"B{island}{rnd.randint(0, 3)}")] = rnd.randint(1, 9)
+
+        islands = list()
+        for edge in dfg:
+            islands = add_edge_to_islands(islands, edge)
+        larger_island = sorted(islands, reverse=True, key=len)[0]
+        expected = { edge: value for edge, value in dfg.items()
+                     if edge[0] in larger_island }
+        assert filter_by_larger_island(dfg) == expected
+
+def test_frequency_dfg_ties_keep_the_first_added_island():
+    # the islands have the same size, and the list of clusters of the
+    # previous implementation kept the island of A20 first
+    event_log = get_tied_log(islands=5, seed=2)
+    for max_no_of_events in (150, 200, 300):
+        dfg = frequency_dfg(event_log, max_no_of_events, [], 0.1)
+        activities = { activity for edge in dfg for activity in edge }
+        assert activities == { f"A{i}" for i in range(20, 30) }